@@ -0,0 +1,287 @@
+# app/clause_index.py
+# 전체 리포트 조항에 대한 영속 벡터 인덱스 (증분 추가 + memmap 로드)
+
+import os
+import json
+import logging
+import threading
+from array import array
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .filelock import file_lock
+from .storage import STORAGE_DIR, REPORT_DIR
+from .embeddings import embed_texts, EmbeddingError
+
+logger = logging.getLogger(__name__)
+
+INDEX_DIR = os.getenv("CLAUSE_INDEX_DIR", os.path.join(STORAGE_DIR, "index"))
+VEC_FILE = "clauses.f32"     # (n, dim) float32 row-major, L2 정규화된 벡터를 이어 붙임
+META_FILE = "clauses.jsonl"  # 벡터 행과 1:1 대응하는 메타 (doc_id, clause_id, page, text)
+HEADER_FILE = "index.json"   # {"dim": d, "model": ...}
+LOCK_FILE = ".lock"          # 프로세스 간 쓰기 잠금 (uvicorn 워커 + tools.ingest 동시 추가)
+ANN_FILE = "ann.npz"         # ANN 인덱스 저장본 (벡터 파일 앞쪽 ntotal행에 대응)
+
+# 근사 검색(ANN): "" 이면 끔(memmap 전수 내적), "ivf" | "flat" | "hnsw" 면 vector_search.ANNIndex 사용
+ANN_BACKEND = os.getenv("CLAUSE_INDEX_ANN", "").lower()
+ANN_STORAGE = os.getenv("CLAUSE_INDEX_ANN_STORAGE", "pq")
+ANN_MIN_ROWS = int(os.getenv("CLAUSE_INDEX_ANN_MIN_ROWS", "50000"))   # 이보다 작으면 전수 검색이 더 빠름
+ANN_NLIST = int(os.getenv("CLAUSE_INDEX_ANN_NLIST", "1024"))
+ANN_NPROBE = int(os.getenv("CLAUSE_INDEX_ANN_NPROBE", "16"))
+ANN_PQ_M = int(os.getenv("CLAUSE_INDEX_ANN_PQ_M", "16"))
+ANN_RERANK = int(os.getenv("CLAUSE_INDEX_ANN_RERANK", "64"))        # k*N개 후보를 memmap 원본 벡터로 재정렬
+ANN_SAVE_EVERY = int(os.getenv("CLAUSE_INDEX_ANN_SAVE_EVERY", "5000"))  # 증분 추가가 이만큼 쌓이면 저장본 갱신
+_ANN_TRAIN_ROWS = 65536
+_ANN_ADD_CHUNK = 65536
+
+
+_DOC_ID_PREFIX = b'{"doc_id": "'
+
+
+def _doc_id_of(line: bytes) -> str:
+    """메타 줄의 doc_id. 첫 필드로 기록된 경우 접두어만 잘라 읽고(UUID라 이스케이프 없음), 아니면 전체 파싱"""
+    if line.startswith(_DOC_ID_PREFIX):
+        end = line.find(b'"', len(_DOC_ID_PREFIX))
+        if end != -1 and line.find(b"\\", len(_DOC_ID_PREFIX), end) == -1:
+            return line[len(_DOC_ID_PREFIX):end].decode("utf-8")
+    return json.loads(line)["doc_id"]
+
+
+class ClauseIndex:
+    """
+    디스크 기반 조항 벡터 인덱스.
+    - add_report(): 새 리포트의 조항만 임베딩해서 파일 끝에 append (재학습 없음)
+    - search(): 벡터 파일을 np.memmap으로 열어 내적(cosine) top-k
+    - 다른 워커가 추가한 행은 메타 파일 크기 변화를 보고 자동으로 다시 매핑
+    - 쓰기는 파일 잠금 안에서 벡터 → 메타 순서로 append. 중단으로 생긴 짝 없는 꼬리는 다음 쓰기 때 잘라냄
+    - 메타는 행별 파일 오프셋만 메모리에 두고, 조항 텍스트는 검색 결과 행만 디스크에서 읽음
+    - CLAUSE_INDEX_ANN 설정 시 행 수가 ANN_MIN_ROWS 이상이면 ANN 인덱스로 검색.
+      저장본(ann.npz)을 읽고 그 뒤에 붙은 행만 증분 추가하며, 후보는 원본 벡터로 재정렬
+    """
+
+    def __init__(self, index_dir: str = INDEX_DIR):
+        self.index_dir = index_dir
+        os.makedirs(index_dir, exist_ok=True)
+        self.vec_path = os.path.join(index_dir, VEC_FILE)
+        self.meta_path = os.path.join(index_dir, META_FILE)
+        self.header_path = os.path.join(index_dir, HEADER_FILE)
+        self.lock_path = os.path.join(index_dir, LOCK_FILE)
+        self.ann_path = os.path.join(index_dir, ANN_FILE)
+        self._lock = threading.Lock()
+        self._ann_lock = threading.Lock()
+        self._ann = None
+        self._ann_saved = 0
+        self.dim: Optional[int] = None
+        self._offsets = array("q")  # 메타 행 i의 시작 바이트 오프셋 (= 벡터 행 i)
+        self.doc_ids: set = set()
+        self._meta_offset = 0
+        self._vecs: Optional[np.ndarray] = None
+        self._load_header()
+        self._refresh()
+
+    # ---------- 로드 ----------
+    def _load_header(self) -> None:
+        if os.path.exists(self.header_path):
+            with open(self.header_path, "r", encoding="utf-8") as f:
+                self.dim = int(json.load(f)["dim"])
+
+    def _refresh(self) -> None:
+        """메타 파일에 새로 붙은 줄만 읽고, 벡터 파일은 memmap으로 다시 연다."""
+        if not os.path.exists(self.meta_path):
+            return
+        size = os.path.getsize(self.meta_path)
+        if size == self._meta_offset and self._vecs is not None:
+            return
+        if self.dim is None:
+            self._load_header()
+        with open(self.meta_path, "rb") as f:
+            f.seek(self._meta_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # 쓰는 중(또는 중단된) 마지막 줄은 건너뜀
+                self._offsets.append(self._meta_offset)
+                self.doc_ids.add(_doc_id_of(line))
+                self._meta_offset += len(line)
+        self._map_vectors()
+
+    def _map_vectors(self) -> None:
+        n = len(self._offsets)
+        if not n or not self.dim or not os.path.exists(self.vec_path):
+            self._vecs = None
+            return
+        # 메타 행 수와 벡터 행 수 중 작은 쪽만 사용 (쓰는 중이거나 중단된 꼬리 무시)
+        rows = os.path.getsize(self.vec_path) // (4 * self.dim)
+        n = min(n, rows)
+        self._vecs = np.memmap(self.vec_path, dtype=np.float32, mode="r", shape=(n, self.dim)) if n else None
+
+    def _repair(self) -> None:
+        """(쓰기 잠금 안에서) 중단된 쓰기의 꼬리 제거: 메타는 마지막 완전한 줄까지, 벡터는 메타 행 수까지"""
+        if os.path.exists(self.meta_path) and os.path.getsize(self.meta_path) > self._meta_offset:
+            with open(self.meta_path, "r+b") as f:
+                f.truncate(self._meta_offset)
+            logger.warning("조항 인덱스 메타 파일의 불완전한 마지막 줄을 잘라냈습니다.")
+        if self.dim and os.path.exists(self.vec_path):
+            want = len(self._offsets) * 4 * self.dim
+            if os.path.getsize(self.vec_path) != want:
+                if os.path.getsize(self.vec_path) < want:
+                    raise RuntimeError("조항 인덱스 벡터 파일이 메타보다 짧습니다. tools/build_clause_index.py로 재생성하세요.")
+                self._vecs = None  # 잘라내기 전에 매핑 해제
+                with open(self.vec_path, "r+b") as f:
+                    f.truncate(want)
+                logger.warning("조항 인덱스 벡터 파일의 짝 없는 꼬리 행을 잘라냈습니다.")
+
+    def _read_meta(self, i: int) -> Dict:
+        with open(self.meta_path, "rb") as f:
+            f.seek(self._offsets[i])
+            return json.loads(f.readline())
+
+    def __len__(self) -> int:
+        return 0 if self._vecs is None else self._vecs.shape[0]
+
+    # ---------- 추가 ----------
+    def add(self, metas: List[Dict], vectors, doc_id: Optional[str] = None) -> int:
+        """메타/벡터 쌍을 파일 끝에 추가. doc_id가 이미 인덱싱돼 있으면 스킵. 반환: 추가된 행 수"""
+        X = np.asarray(vectors, dtype=np.float32)
+        if X.ndim != 2 or X.shape[0] != len(metas) or not len(metas):
+            return 0
+        X /= np.maximum(np.linalg.norm(X, axis=1, keepdims=True), 1e-12)
+
+        with self._lock, file_lock(self.lock_path):
+            self._refresh()
+            if doc_id is not None and doc_id in self.doc_ids:
+                return 0  # 다른 프로세스가 먼저 추가
+            if self.dim is None:
+                self.dim = int(X.shape[1])
+                with open(self.header_path, "w", encoding="utf-8") as f:
+                    json.dump({"dim": self.dim, "model": os.getenv("GEMINI_EMBED_MODEL", "text-embedding-004")}, f)
+            elif X.shape[1] != self.dim:
+                raise ValueError(f"임베딩 차원 불일치: index={self.dim}, new={X.shape[1]}")
+            self._repair()
+
+            # 벡터 먼저 → 메타 나중: 읽는 쪽은 메타 줄 수만큼만 본다
+            with open(self.vec_path, "ab") as f:
+                f.write(X.tobytes())
+            with open(self.meta_path, "a", encoding="utf-8") as f:
+                # doc_id를 항상 첫 필드로 → _refresh가 줄 전체(조항 텍스트)를 파싱하지 않고 읽음
+                f.write("".join(json.dumps({"doc_id": m["doc_id"], **m}, ensure_ascii=False) + "\n" for m in metas))
+            self._refresh()
+        return len(metas)
+
+    def add_report(self, report: Dict) -> int:
+        """리포트 dict(Report.model_dump 형식)의 조항을 임베딩해 추가. 이미 인덱싱된 doc_id는 스킵."""
+        doc_id = str(report.get("doc_id"))
+        self._refresh()
+        if doc_id in self.doc_ids:
+            return 0
+        clauses = [c for c in report.get("clauses") or [] if (c.get("text") or "").strip()]
+        if not clauses:
+            return 0
+        vecs = embed_texts([c["text"] for c in clauses])
+        if len(vecs) != len(clauses):
+            logger.warning(f"조항 임베딩 실패/누락으로 인덱싱 스킵: doc_id={doc_id}")
+            return 0
+        metas = [
+            {"doc_id": doc_id, "clause_id": c["id"], "page": c.get("page"), "text": c["text"]}
+            for c in clauses
+        ]
+        return self.add(metas, vecs, doc_id=doc_id)
+
+    # ---------- ANN ----------
+    def _new_ann(self):
+        from .vector_search import ANNIndex
+        return ANNIndex(backend=ANN_BACKEND, storage=ANN_STORAGE, nlist=ANN_NLIST, nprobe=ANN_NPROBE,
+                        pq_m=ANN_PQ_M, rerank=ANN_RERANK)
+
+    def _load_ann(self, n: int):
+        """저장본이 현재 설정/차원과 맞고 벡터 파일보다 앞서 있지 않을 때만 사용"""
+        if not os.path.exists(self.ann_path):
+            return None
+        from .vector_search import ANNIndex
+        try:
+            ann = ANNIndex.load(self.ann_path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"ANN 저장본을 읽지 못해 다시 구축합니다: {e}")
+            return None
+        if (ann.backend, ann.storage, ann.dim) != (ANN_BACKEND, ANN_STORAGE, self.dim) or ann.ntotal > n:
+            return None
+        ann.nprobe, ann.rerank = ANN_NPROBE, ANN_RERANK  # 검색 시점 파라미터는 현재 설정을 따름
+        return ann
+
+    def sync_ann(self, save: bool = False) -> bool:
+        """
+        ANN 인덱스를 현재 벡터 행 수에 맞춤: 저장본 로드(없으면 표본 학습 후 구축) → 새 행만 증분 추가.
+        save=True면 저장본을 항상 갱신. ANN 비활성/행 수 부족이면 False. 첫 구축은 오래 걸리므로 tools/build_clause_index로 미리 실행 권장.
+        """
+        if not ANN_BACKEND:
+            return False
+        self._refresh()
+        n = len(self)
+        with self._ann_lock:
+            if self._ann is None:
+                if n < ANN_MIN_ROWS:
+                    return False
+                self._ann = self._load_ann(n)
+                if self._ann is not None:
+                    self._ann_saved = self._ann.ntotal
+                else:
+                    sample = np.sort(np.random.default_rng(0).permutation(n)[:_ANN_TRAIN_ROWS])
+                    self._ann = self._new_ann().train(self._vecs[sample])
+                    self._ann_saved = -1
+                    logger.info(f"ANN 인덱스 학습 완료: backend={ANN_BACKEND}, storage={ANN_STORAGE}, rows={n}")
+            for s in range(self._ann.ntotal, n, _ANN_ADD_CHUNK):
+                self._ann.add(self._vecs[s:min(n, s + _ANN_ADD_CHUNK)])
+            if save or self._ann_saved < 0 or self._ann.ntotal - self._ann_saved >= ANN_SAVE_EVERY:
+                self._ann.save(self.ann_path)
+                self._ann_saved = self._ann.ntotal
+        return True
+
+    # ---------- 검색 ----------
+    def search_vector(self, qvec, k: int = 5) -> List[Dict]:
+        self._refresh()
+        if self._vecs is None or not len(self):
+            return []
+        q = np.asarray(qvec, dtype=np.float32).ravel()
+        q /= max(float(np.linalg.norm(q)), 1e-12)
+        if self.sync_ann():
+            with self._ann_lock:
+                ids, sims = self._ann.query_many(q[None, :], k, vectors=self._vecs)
+            return [dict(self._read_meta(int(i)), score=float(v)) for i, v in zip(ids[0], sims[0]) if i >= 0]
+        sims = self._vecs @ q
+        k = min(k, sims.shape[0])
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top])]
+        return [dict(self._read_meta(int(i)), score=float(sims[i])) for i in top]
+
+    def search(self, query: str, k: int = 5) -> List[Dict]:
+        vecs = embed_texts([query])
+        if not vecs:
+            raise RuntimeError("질의 임베딩 생성 실패")
+        return self.search_vector(vecs[0], k=k)
+
+
+_INDEX: Optional[ClauseIndex] = None
+
+
+def get_index() -> ClauseIndex:
+    """프로세스 단위 싱글턴 (워커 시작 시 재학습 없이 memmap만 연다)"""
+    global _INDEX
+    if _INDEX is None:
+        _INDEX = ClauseIndex()
+    return _INDEX
+
+
+def index_all_reports(report_dir: str = REPORT_DIR) -> int:
+    """저장된 전체 리포트를 인덱스에 반영(이미 들어간 doc_id는 스킵). 반환: 추가된 조항 수"""
+    idx = get_index()
+    added = 0
+    for name in sorted(os.listdir(report_dir)):
+        if not name.endswith(".json"):
+            continue
+        with open(os.path.join(report_dir, name), "r", encoding="utf-8") as f:
+            report = json.load(f)
+        try:
+            added += idx.add_report(report)
+        except EmbeddingError as e:
+            logger.warning(f"인덱싱 실패(다음 실행에서 재시도): {name}: {e}")
+    return added
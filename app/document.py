@@ -0,0 +1,74 @@
+# app/document.py
+# 문서 모델: 정규화 텍스트 1벌 + 페이지 경계/조항 스팬 오프셋 배열
+
+from array import array
+from bisect import bisect_right
+from typing import Iterable, Iterator, List, Tuple
+
+# 줄 앞뒤에서 제거할 따옴표/쉼표 (CSV식 추출 잔여물)
+_LINE_STRIP = '",“”‘’'
+
+
+class Document:
+    """
+    정규화된 전체 텍스트를 한 번만 만들고, 이후 단계는 오프셋으로만 참조한다.
+    - text: 페이지를 '\\n'으로 이은 정규화 텍스트(줄 앞뒤 공백/따옴표 제거, 빈 줄 제거)
+    - page_starts: 각 페이지가 text에서 시작하는 오프셋 (0-based 페이지 인덱스)
+    - clause_starts/clause_ends: 조항 스팬 [start, end) (splitters.split_spans가 채움)
+    """
+    __slots__ = ("text", "page_starts", "clause_starts", "clause_ends")
+
+    def __init__(self, text: str, page_starts: array):
+        self.text = text
+        self.page_starts = page_starts
+        self.clause_starts = array("q")
+        self.clause_ends = array("q")
+
+    @classmethod
+    def from_pages(cls, pages: Iterable[str]) -> "Document":
+        """
+        페이지 텍스트(utils_pdf._normalize_ko 적용본) → Document. 문자열 결합은 1회.
+        제너레이터(utils_pdf.iter_pdf_pages)를 넘기면 페이지 원문을 보관하지 않고 스트리밍으로 구성.
+        """
+        parts: List[str] = []
+        page_starts = array("q")
+        pos = 0
+        for page in pages or []:
+            page_starts.append(pos)
+            for line in (page or "").split("\n"):
+                # 줄 내부 공백류는 1칸으로 (rules.apply_rules의 '\s+'→' ' 정규화와 동일 효과)
+                line = " ".join(line.strip().strip(_LINE_STRIP).split())
+                if not line:
+                    continue
+                if parts:
+                    pos += 1  # '\n' 구분자
+                parts.append(line)
+                pos += len(line)
+        return cls("\n".join(parts), page_starts)
+
+    # ---------- 페이지 ----------
+    @property
+    def num_pages(self) -> int:
+        return len(self.page_starts)
+
+    def page_of(self, offset: int) -> int:
+        """오프셋이 속한 페이지(0-based). 빈 페이지는 다음 페이지와 같은 시작점을 가진다."""
+        return max(bisect_right(self.page_starts, offset) - 1, 0)
+
+    # ---------- 조항 스팬 ----------
+    def add_clause(self, start: int, end: int) -> None:
+        self.clause_starts.append(start)
+        self.clause_ends.append(end)
+
+    def __len__(self) -> int:
+        return len(self.clause_starts)
+
+    def spans(self) -> Iterator[Tuple[int, int]]:
+        return zip(self.clause_starts, self.clause_ends)
+
+    def clause_text(self, i: int) -> str:
+        return self.text[self.clause_starts[i]:self.clause_ends[i]]
+
+    def clause_texts(self) -> List[str]:
+        t = self.text
+        return [t[s:e] for s, e in self.spans()]
@@ -2,15 +2,21 @@
 
 from sentence_transformers import SentenceTransformer
 import numpy as np, faiss, os
+from .embedding_cache import EmbeddingCache
+from .embeddings import EMBED_CACHE_DIR
 
 class EmbedIndex:
     def __init__(self, model_name: str):
         self.model = SentenceTransformer(model_name)
+        self.cache = EmbeddingCache(model_name, EMBED_CACHE_DIR)
         self.index = None
         self.emb = None
 
     def fit(self, texts):
-        vecs = self.model.encode(texts, normalize_embeddings=True)
+        # 이전 실행에서 인코딩한 텍스트는 캐시에서 재사용
+        vecs = self.cache.get_or_compute(
+            list(texts), lambda miss: self.model.encode(miss, normalize_embeddings=True)
+        )
         self.emb = np.array(vecs, dtype="float32")
         self.index = faiss.IndexFlatIP(self.emb.shape[1])
         self.index.add(self.emb)
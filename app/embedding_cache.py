@@ -0,0 +1,121 @@
+# app/embedding_cache.py
+# 내용 해시 키 기반 임베딩 캐시 (세그먼트 .npy memmap + append-only 키 파일)
+
+import os
+import re
+import json
+import hashlib
+import threading
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from .filelock import file_lock
+
+SEG_ROWS = int(os.getenv("EMBED_CACHE_SEG_ROWS", "8192"))  # 세그먼트 파일 1개당 행 수
+
+
+def content_key(text: str) -> str:
+    return hashlib.sha1((text or "").encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    모델별 디렉터리에 (키 → 벡터)를 저장. 같은 조항 텍스트는 코퍼스 전체에서 한 번만 임베딩.
+    - keys.txt: 행 번호 = 벡터 행 번호 (벡터를 먼저 쓰고 키를 나중에 append)
+    - vec_XXXXX.npy: SEG_ROWS 행짜리 float32 세그먼트, np.lib.format.open_memmap으로 매핑
+    세그먼트를 교체/확장하지 않으므로 다른 프로세스가 매핑 중이어도 안전.
+    """
+
+    def __init__(self, model: str, cache_dir: str):
+        self.dir = os.path.join(cache_dir, re.sub(r"[^\w.-]+", "_", model))
+        os.makedirs(self.dir, exist_ok=True)
+        self.keys_path = os.path.join(self.dir, "keys.txt")
+        self.meta_path = os.path.join(self.dir, "meta.json")
+        self.lock_path = os.path.join(self.dir, ".lock")
+        self.dim: Optional[int] = None
+        self._rows: Dict[str, int] = {}
+        self._nrows = 0  # keys.txt 줄 수 (= 기록된 벡터 행 수)
+        self._keys_offset = 0
+        self._segments: Dict[int, np.memmap] = {}
+        self._lock = threading.Lock()
+        self._refresh()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    # ---------- 내부 ----------
+    def _refresh(self) -> None:
+        if self.dim is None and os.path.exists(self.meta_path):
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                self.dim = int(json.load(f)["dim"])
+        if not os.path.exists(self.keys_path) or os.path.getsize(self.keys_path) == self._keys_offset:
+            return
+        with open(self.keys_path, "rb") as f:
+            f.seek(self._keys_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                self._rows.setdefault(line[:-1].decode("ascii"), self._nrows)
+                self._nrows += 1
+                self._keys_offset += len(line)
+
+    def _segment(self, seg: int, create: bool = False) -> np.memmap:
+        mm = self._segments.get(seg)
+        if mm is None:
+            path = os.path.join(self.dir, f"vec_{seg:05d}.npy")
+            if create and not os.path.exists(path):
+                mm = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(SEG_ROWS, self.dim))
+            else:
+                mm = np.lib.format.open_memmap(path, mode="r+")
+            self._segments[seg] = mm
+        return mm
+
+    def _row(self, r: int) -> np.ndarray:
+        return self._segment(r // SEG_ROWS)[r % SEG_ROWS]
+
+    # ---------- 공개 API ----------
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        with self._lock:
+            self._refresh()
+            return {k: np.array(self._row(self._rows[k])) for k in keys if k in self._rows}
+
+    def put_many(self, keys: List[str], vectors) -> None:
+        X = np.asarray(vectors, dtype=np.float32)
+        if not len(keys):
+            return
+        with self._lock, file_lock(self.lock_path):
+            self._refresh()  # 다른 프로세스가 그 사이 추가한 키 반영
+            if self.dim is None:
+                self.dim = int(X.shape[1])
+                with open(self.meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"dim": self.dim}, f)
+            elif X.shape[1] != self.dim:
+                raise ValueError(f"임베딩 차원 불일치: cache={self.dim}, new={X.shape[1]}")
+
+            new = list({k: v for k, v in zip(keys, X) if k not in self._rows}.items())
+            start = self._nrows
+            for i, (_, v) in enumerate(new):
+                r = start + i
+                self._segment(r // SEG_ROWS, create=True)[r % SEG_ROWS] = v
+            for seg in {(start + i) // SEG_ROWS for i in range(len(new))}:
+                self._segments[seg].flush()
+            with open(self.keys_path, "ab") as f:
+                f.write(b"".join(k.encode("ascii") + b"\n" for k, _ in new))
+            self._refresh()
+
+    def get_or_compute(self, texts: List[str], compute: Callable[[List[str]], List[List[float]]]) -> np.ndarray:
+        """캐시에 없는 고유 텍스트만 compute()로 임베딩하고, 입력 순서대로 (n, d) 반환."""
+        keys = [content_key(t) for t in texts]
+        found = self.get_many(keys)
+        missing: Dict[str, str] = {}
+        for k, t in zip(keys, texts):
+            if k not in found:
+                missing.setdefault(k, t)
+        if missing:
+            vecs = np.asarray(compute(list(missing.values())), dtype=np.float32)
+            self.put_many(list(missing.keys()), vecs)
+            found.update(zip(missing.keys(), vecs))
+        if not keys:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return np.stack([found[k] for k in keys])
@@ -1,30 +1,110 @@
 # app/embeddings.py
 import os
+import time
+import random
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import numpy as np
 import google.generativeai as genai
 
+from .storage import STORAGE_DIR
+from .ratelimit import RateLimiter
+from .embedding_cache import EmbeddingCache
+
 EMBED_MODEL = os.getenv("GEMINI_EMBED_MODEL", "text-embedding-004")
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY",""))
+# GEMINI_API_ENDPOINT: 로컬 스텁(tools/gemini_stub.py) 등 대체 REST 엔드포인트
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT", "").strip()
+if GEMINI_API_ENDPOINT:
+    genai.configure(api_key=os.getenv("GOOGLE_API_KEY",""), transport="rest",
+                    client_options={"api_endpoint": GEMINI_API_ENDPOINT})
+else:
+    genai.configure(api_key=os.getenv("GOOGLE_API_KEY",""))
+
+# batchEmbedContents 1회 요청당 최대 100건
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "100"))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+EMBED_RPM = float(os.getenv("EMBED_RPM", "1500"))       # 분당 요청 수 상한 (0이면 제한 없음)
+EMBED_RETRIES = int(os.getenv("EMBED_RETRIES", "3"))
+EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", os.path.join(STORAGE_DIR, "embed_cache"))
 
 logger = logging.getLogger(__name__)
 
-def embed_texts(texts: list[str]) -> list[list[float]]:
-    """텍스트 리스트를 임베딩 벡터로 변환"""
+_limiter = RateLimiter.per_minute(EMBED_RPM, burst=EMBED_CONCURRENCY)
+_cache = None
+
+
+class EmbeddingError(RuntimeError):
+    """재시도 후에도 일부 청크 임베딩에 실패"""
+
+
+def _model_name() -> str:
+    return EMBED_MODEL if EMBED_MODEL.startswith("models/") else f"models/{EMBED_MODEL}"
+
+
+def _get_cache() -> EmbeddingCache:
+    global _cache
+    if _cache is None:
+        _cache = EmbeddingCache(EMBED_MODEL, EMBED_CACHE_DIR)
+    return _cache
+
+
+def _embed_batch(texts: List[str]) -> List[List[float]]:
+    """API 1회 호출 (texts는 EMBED_BATCH_SIZE 이하)"""
+    _limiter.acquire()
+    resp = genai.embed_content(model=_model_name(), content=texts)
+    # google-generativeai==0.8.x는 batch 반환 형식이 아래처럼 옴
+    vecs = resp["embedding"] if "embedding" in resp else resp["embeddings"]
+    # vecs가 dict일 수도 있으니 안전 처리
+    if isinstance(vecs, dict) and "values" in vecs:
+        vecs = [vecs["values"]]
+    elif isinstance(vecs, list) and vecs and isinstance(vecs[0], dict) and "values" in vecs[0]:
+        vecs = [v["values"] for v in vecs]
+    if len(vecs) != len(texts):
+        raise EmbeddingError(f"임베딩 개수 불일치: {len(vecs)} != {len(texts)}")
+    return vecs
+
+
+def _embed_chunked(texts: List[str]) -> List[List[float]]:
+    """
+    배치 한도로 청크 분할 → 스레드 풀로 동시 호출(RateLimiter 공유).
+    실패한 청크만 지수 백오프 후 재시도, 끝내 실패하면 EmbeddingError.
+    """
+    chunks = [texts[i:i + EMBED_BATCH_SIZE] for i in range(0, len(texts), EMBED_BATCH_SIZE)]
+    results: List = [None] * len(chunks)
+    pending = list(range(len(chunks)))
+    last_err = None
+
+    with ThreadPoolExecutor(max_workers=max(1, min(EMBED_CONCURRENCY, len(chunks)))) as pool:
+        for attempt in range(EMBED_RETRIES):
+            if attempt:
+                time.sleep(1.1 * (1.7 ** (attempt - 1)) + random.uniform(0, 0.4))
+            futures = {ci: pool.submit(_embed_batch, chunks[ci]) for ci in pending}
+            failed = []
+            for ci, fut in futures.items():
+                try:
+                    results[ci] = fut.result()
+                except Exception as e:
+                    last_err = e
+                    failed.append(ci)
+            if not failed:
+                break
+            logger.warning(f"임베딩 청크 {len(failed)}/{len(chunks)}개 실패 (시도 {attempt + 1}/{EMBED_RETRIES}): {last_err}")
+            pending = failed
+        else:
+            raise EmbeddingError(f"임베딩 생성 실패: 청크 {len(pending)}개, 마지막 오류: {last_err}")
+
+    return [v for chunk in results for v in chunk]
+
+
+def embed_texts(texts: list[str], use_cache: bool = True) -> list[list[float]]:
+    """
+    텍스트 리스트를 임베딩 벡터로 변환 (입력 순서 유지).
+    고유 텍스트만, 캐시에 없는 것만 API로 보낸다. 실패 시 EmbeddingError.
+    """
     if not texts:
         return []
-    
-    try:
-        # Gemini 임베딩: 길면 잘라서 쓰세요(문서 chunk)
-        resp = genai.embed_content(model=EMBED_MODEL, content=texts)
-        # google-generativeai==0.8.x는 batch 반환 형식이 아래처럼 옴
-        vecs = resp["embedding"] if "embedding" in resp else resp["embeddings"]
-        # vecs가 dict일 수도 있으니 안전 처리
-        if isinstance(vecs, dict) and "values" in vecs:
-            return [vecs["values"]]
-        if isinstance(vecs, list) and vecs and isinstance(vecs[0], dict) and "values" in vecs[0]:
-            return [v["values"] for v in vecs]
-        return vecs
-    except Exception as e:
-        # 임베딩 실패 시 빈 리스트 반환
-        logger.error(f"임베딩 생성 실패: {e}")
-        return []
+    if not use_cache:
+        return _embed_chunked(list(texts))
+    return _get_cache().get_or_compute(list(texts), _embed_chunked).tolist()
@@ -0,0 +1,318 @@
+# app/export.py
+# 리포트/조항/리스크 → 일자 파티션 컬럼 파일(Parquet 또는 Arrow IPC) 증분 내보내기
+# - 레이아웃: {EXPORT_DIR}/{reports|clauses|risks}/date=YYYY-MM-DD/part-<run>.parquet (hive 파티션)
+# - 워터마크: 리포트 파일 mtime 기준. 지난 실행 이후 새로 저장/재스캔된 문서만 다시 내보냄
+# - doc_id 기준 교체: 다시 내보낸 문서는 새 part에 쓰고, 그 doc_id가 들어 있던 기존 part만 해당 행을 빼고 다시 씀
+#   (파티션 일자는 created_at 기준이라 재저장해도 바뀌지 않음)
+# - pyarrow는 옵션 의존성 (pip install pyarrow)
+
+import glob
+import json
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .storage import REPORT_DIR, STORAGE_DIR
+
+EXPORT_DIR = os.getenv("EXPORT_DIR", os.path.join(STORAGE_DIR, "export"))
+# 이보다 최근에 수정된 파일은 쓰는 중일 수 있어 다음 실행으로 미룸
+EXPORT_SETTLE_SECONDS = float(os.getenv("EXPORT_SETTLE_SECONDS", "5"))
+
+TABLES = ("reports", "clauses", "risks")
+WATERMARK_FILE = "_watermark.json"
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("컬럼 내보내기는 pyarrow 설치가 필요합니다. (pip install pyarrow)") from e
+    return pa, pq
+
+
+def _schemas(pa) -> Dict:
+    cat = pa.dictionary(pa.int32(), pa.string())  # 반복 값이 많은 열은 사전 인코딩
+    return {
+        "reports": pa.schema([
+            ("doc_id", pa.string()), ("created_at", pa.timestamp("ms", tz="UTC")), ("pages", pa.int32()),
+            ("file_path", pa.string()), ("rules_version", cat), ("one_line", pa.string()),
+            ("n_clauses", pa.int32()), ("n_risks", pa.int32()),
+        ]),
+        "clauses": pa.schema([
+            ("doc_id", pa.string()), ("clause_id", pa.int32()), ("page", pa.int32()),
+            ("start", pa.int64()), ("end", pa.int64()), ("length", pa.int32()), ("text", pa.large_string()),
+        ]),
+        "risks": pa.schema([
+            ("doc_id", pa.string()), ("clause_id", pa.int32()), ("type", cat), ("severity", cat),
+            ("llm_verdict", cat), ("reason", pa.string()), ("rule_hits", pa.list_(pa.string())),
+            ("evidence_ids", pa.list_(pa.int32())),
+        ]),
+    }
+
+
+def load_watermark(export_dir: str = EXPORT_DIR) -> Dict:
+    try:
+        with open(os.path.join(export_dir, WATERMARK_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"cutoff": 0.0, "runs": 0, "rows": {t: 0 for t in TABLES}, "replaced": {t: 0 for t in TABLES},
+                "retry": []}
+
+
+def _save_watermark(export_dir: str, wm: Dict) -> None:
+    path = os.path.join(export_dir, WATERMARK_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(wm, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def _candidates(report_dir: str, after: float, until: float) -> List[Tuple[float, str]]:
+    """after < mtime <= until 인 리포트 파일 (mtime 순). 파일을 열지 않고 stat만 사용"""
+    out = []
+    with os.scandir(report_dir) as it:
+        for e in it:
+            if not e.name.endswith(".json"):
+                continue
+            mtime = e.stat().st_mtime
+            if after < mtime <= until:
+                out.append((mtime, e.path))
+    out.sort()
+    return out
+
+
+def _created(report: Dict, mtime: float) -> datetime:
+    s = (report.get("meta") or {}).get("created_at")
+    if s:
+        try:
+            return datetime.fromisoformat(s.replace("Z", "+00:00")).astimezone(timezone.utc)
+        except ValueError:
+            pass
+    return datetime.fromtimestamp(mtime, timezone.utc)  # created_at 도입 이전 리포트
+
+
+def _rows(report: Dict, created: datetime) -> Dict[str, List[Dict]]:
+    doc_id = str(report.get("doc_id"))
+    meta = report.get("meta") or {}
+    clauses = report.get("clauses") or []
+    risks = report.get("risks") or []
+    return {
+        "reports": [{
+            "doc_id": doc_id, "created_at": created, "pages": meta.get("pages"),
+            "file_path": meta.get("file_path"), "rules_version": meta.get("rules_version"),
+            "one_line": (report.get("summary") or {}).get("one_line"),
+            "n_clauses": len(clauses), "n_risks": len(risks),
+        }],
+        "clauses": [{
+            "doc_id": doc_id, "clause_id": c.get("id"), "page": c.get("page"), "start": c.get("start"),
+            "end": c.get("end"), "length": len(c.get("text") or ""), "text": c.get("text"),
+        } for c in clauses],
+        "risks": [{
+            "doc_id": doc_id, "clause_id": (r.get("evidence_ids") or [None])[0], "type": r.get("type"),
+            "severity": r.get("severity"), "llm_verdict": r.get("llm_verdict"), "reason": r.get("reason"),
+            "rule_hits": r.get("rule_hits") or [], "evidence_ids": r.get("evidence_ids") or [],
+        } for r in risks],
+    }
+
+
+class _PartitionWriters:
+    """
+    (table, date)별 writer를 열어 두고 chunk마다 row group 추가 → 이번 실행의 새 part.
+    커밋 시 이번에 내보낸 doc_id가 이미 들어 있는 기존 part만 골라 그 행을 빼고 다시 쓴다
+    (어느 part에 있는지는 reports 테이블의 doc_id 열만 읽어 확인). 새 문서만 있으면 추가만 하고 기존 part는 그대로.
+    순서: 기존 part 정리(clauses/risks → reports) → 새 part 교체(clauses/risks → reports).
+    reports part가 마지막이라 중단돼도 재실행 시 같은 doc_id를 다시 찾아 정리하고,
+    reports 없이 남은 새 clauses/risks part는 _drop_orphans가 지운다.
+    """
+
+    def __init__(self, pa, pq, export_dir: str, fmt: str, run: str):
+        self.pa, self.pq = pa, pq
+        self.export_dir, self.fmt, self.run = export_dir, fmt, run
+        self.ext = "parquet" if fmt == "parquet" else "arrow"
+        self.schemas = _schemas(pa)
+        self._open: Dict[Tuple[str, str], Tuple[object, str]] = {}
+        self.doc_ids: Dict[str, set] = {}  # day → 이번 실행에서 내보낸 doc_id
+        self.replaced = {t: 0 for t in TABLES}
+        self.rewritten = 0  # 다시 쓴 기존 part 파일 수
+
+    def _dir(self, table: str, day: str) -> str:
+        return os.path.join(self.export_dir, table, f"date={day}")
+
+    def _new_writer(self, path: str, table: str):
+        if self.fmt == "parquet":
+            return self.pq.ParquetWriter(path, self.schemas[table], compression="zstd")
+        return self.pa.ipc.new_file(path, self.schemas[table])
+
+    def _writer(self, table: str, day: str):
+        key = (table, day)
+        if key not in self._open:
+            d = self._dir(table, day)
+            os.makedirs(d, exist_ok=True)
+            path = os.path.join(d, f"part-{self.run}.{self.ext}")
+            self._open[key] = (self._new_writer(path + ".tmp", table), path)
+        return self._open[key][0]
+
+    def write(self, table: str, day: str, rows: List[Dict]) -> None:
+        if not rows:
+            return
+        self._writer(table, day).write_table(self.pa.Table.from_pylist(rows, schema=self.schemas[table]))
+
+    def _batches(self, path: str):
+        if self.fmt == "parquet":
+            yield from self.pq.ParquetFile(path).iter_batches(batch_size=65536)
+        else:
+            with self.pa.OSFile(path, "rb") as src:
+                r = self.pa.ipc.open_file(src)
+                for i in range(r.num_record_batches):
+                    yield r.get_batch(i)
+
+    def _doc_ids_in(self, path: str):
+        if self.fmt == "parquet":
+            return self.pq.read_table(path, columns=["doc_id"]).column("doc_id")
+        with self.pa.OSFile(path, "rb") as src:
+            return self.pa.ipc.open_file(src).read_all().column("doc_id")
+
+    def _rewrite(self, path: str, table: str, ids) -> None:
+        """기존 part에서 ids 행을 뺀 나머지로 교체 (남는 행이 없으면 파일 삭제)"""
+        import pyarrow.compute as pc
+        tmp = f"{path}.{self.run}.tmp"
+        w = None
+        for batch in self._batches(path):
+            keep = batch.filter(pc.invert(pc.is_in(batch.column("doc_id"), value_set=ids)))
+            self.replaced[table] += batch.num_rows - keep.num_rows
+            if keep.num_rows:
+                if w is None:
+                    w = self._new_writer(tmp, table)
+                w.write_table(self.pa.Table.from_batches([keep]).cast(self.schemas[table]))
+        if w is None:
+            os.remove(path)
+        else:
+            w.close()
+            os.replace(tmp, path)
+
+    def _drop_replaced(self) -> None:
+        import pyarrow.compute as pc
+        mine = f"part-{self.run}.{self.ext}"
+        for day, doc_ids in self.doc_ids.items():
+            ids = self.pa.array(sorted(doc_ids), type=self.pa.string())
+            for p in sorted(glob.glob(os.path.join(self._dir("reports", day), f"part-*.{self.ext}"))):
+                name = os.path.basename(p)
+                if name == mine or not pc.any(pc.is_in(self._doc_ids_in(p), value_set=ids)).as_py():
+                    continue
+                for t in ("clauses", "risks", "reports"):
+                    tp = os.path.join(self._dir(t, day), name)
+                    if os.path.exists(tp):
+                        self._rewrite(tp, t, ids)
+                        self.rewritten += 1
+
+    def close(self, commit: bool) -> None:
+        try:
+            if commit:
+                self._drop_replaced()
+        except BaseException:
+            commit = False
+            raise
+        finally:
+            for key in sorted(self._open, key=lambda k: k[0] == "reports"):
+                w, path = self._open[key]
+                w.close()
+                if commit:
+                    os.replace(path + ".tmp", path)
+                else:
+                    os.remove(path + ".tmp")
+            self._open.clear()
+
+
+def _drop_orphans(export_dir: str) -> None:
+    """새 part 교체 중 중단돼 reports part 없이 남은 clauses/risks part 삭제 (워터마크 미갱신 → 다시 내보냄)"""
+    for t in ("clauses", "risks"):
+        for p in glob.glob(os.path.join(export_dir, t, "date=*", "part-*")):
+            day_dir = os.path.basename(os.path.dirname(p))
+            if not os.path.exists(os.path.join(export_dir, "reports", day_dir, os.path.basename(p))):
+                os.remove(p)
+
+
+def _iter_chunks(items: List, size: int) -> Iterator[List]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def export_reports(report_dir: str = REPORT_DIR, export_dir: str = EXPORT_DIR, fmt: str = "parquet",
+                   full: bool = False, chunk: int = 2000, now: Optional[float] = None) -> Dict:
+    """
+    워터마크 이후 새로 저장(또는 재스캔)된 리포트를 내보내고 워터마크 갱신.
+    이미 내보낸 doc_id는 해당 파티션에서 교체되므로 중단 후 재실행해도 중복 행이 생기지 않는다.
+    full=True면 기존 내보내기를 지우고 처음부터 다시 생성.
+    읽지 못한 리포트는 워터마크의 retry 목록에 남겨 다음 실행에서 다시 시도한다.
+    반환: {"docs", "skipped"(읽기 실패, 재시도 예정), "rows": {table: n}, "replaced": {table: n},
+           "rewritten_parts"(행을 빼고 다시 쓴 기존 part 파일 수), "cutoff"}
+    """
+    if fmt not in ("parquet", "arrow"):
+        raise ValueError(f"지원하지 않는 형식: {fmt}")
+    pa, pq = _pyarrow()
+    if full:
+        for t in TABLES:
+            shutil.rmtree(os.path.join(export_dir, t), ignore_errors=True)
+        if os.path.exists(os.path.join(export_dir, WATERMARK_FILE)):
+            os.remove(os.path.join(export_dir, WATERMARK_FILE))
+    os.makedirs(export_dir, exist_ok=True)
+    # 중단된 이전 실행이 남긴 임시 파일 정리 (워터마크가 갱신되지 않았으므로 이번에 다시 내보냄)
+    for tmp in glob.glob(os.path.join(export_dir, "*", "date=*", "*.tmp")):
+        os.remove(tmp)
+    _drop_orphans(export_dir)
+
+    wm = load_watermark(export_dir)
+    if wm.get("format", fmt) != fmt:
+        raise ValueError(f"기존 내보내기 형식({wm['format']})과 다릅니다. full=True로 다시 생성하세요.")
+    after = float(wm.get("cutoff") or 0.0)
+    until = (now if now is not None else time.time()) - EXPORT_SETTLE_SECONDS
+    files = _candidates(report_dir, after, until)
+    # 지난 실행에서 읽지 못한 파일은 mtime과 상관없이 다시 시도 (고쳐서 다시 쓰였으면 이미 files에 포함)
+    seen = {p for _, p in files}
+    for path in wm.get("retry") or []:
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            continue  # 삭제됨
+        if path not in seen and mtime <= after:
+            files.append((mtime, path))
+
+    run = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f") + f"-{os.getpid()}"  # 기존 part와 이름이 겹치면 안 됨
+    writers = _PartitionWriters(pa, pq, export_dir, fmt, run)
+    counts = {t: 0 for t in TABLES}
+    docs = 0
+    retry: List[str] = []
+    try:
+        for part in _iter_chunks(files, chunk):
+            by_day: Dict[Tuple[str, str], List[Dict]] = {}
+            for mtime, path in part:
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        report = json.load(f)
+                except (OSError, ValueError):
+                    retry.append(path)  # 워터마크는 전진하되 다음 실행에서 이 파일만 다시 시도
+                    continue
+                created = _created(report, mtime)
+                day = created.strftime("%Y-%m-%d")
+                writers.doc_ids.setdefault(day, set()).add(str(report.get("doc_id")))
+                for t, rows in _rows(report, created).items():
+                    by_day.setdefault((t, day), []).extend(rows)
+                docs += 1
+            for (t, day), rows in by_day.items():
+                writers.write(t, day, rows)
+                counts[t] += len(rows)
+    except BaseException:
+        writers.close(commit=False)
+        raise
+    writers.close(commit=True)
+
+    # 행 수는 마지막 실행분만 기록 (교체가 섞이면 누적값은 중단/재실행 시 어긋남)
+    replaced = writers.replaced
+    wm = {"cutoff": max(after, until), "runs": int(wm.get("runs") or 0) + 1,
+          "rows": counts, "replaced": replaced, "retry": retry, "format": fmt, "last_run": run}
+    _save_watermark(export_dir, wm)
+    return {"docs": docs, "skipped": len(retry), "rows": counts, "replaced": replaced,
+            "rewritten_parts": writers.rewritten, "cutoff": wm["cutoff"]}
@@ -0,0 +1,29 @@
+# app/filelock.py
+# 프로세스 간 파일 잠금 (uvicorn 워커, tools.ingest/rescan 등 여러 프로세스가 같은 파일을 갱신할 때)
+
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def file_lock(path: str):
+    """배타 잠금 (POSIX: fcntl / Windows: msvcrt). path는 잠금 전용 파일."""
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
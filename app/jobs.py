@@ -0,0 +1,122 @@
+# app/jobs.py
+# 분석 작업 실행기 + 서버 전역 admission control (동시 실행 상한, 대기열 상한, 클라이언트별 쿼터)
+
+import os
+import time
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+MAX_CONCURRENT_ANALYSES = int(os.getenv("MAX_CONCURRENT_ANALYSES", str(os.cpu_count() or 2)))
+MAX_QUEUED_ANALYSES = int(os.getenv("MAX_QUEUED_ANALYSES", "32"))
+CLIENT_MAX_INFLIGHT = int(os.getenv("CLIENT_MAX_INFLIGHT", "0"))  # 클라이언트별 실행+대기 상한 (0이면 제한 없음)
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "10000"))             # 메모리에 보관할 완료 작업 수
+
+
+class AdmissionRejected(Exception):
+    """대기열/쿼터 초과 → 429 + Retry-After"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class JobRunner:
+    """
+    분석 작업을 최대 max_concurrent개 스레드에서 실행하고, 대기 작업은 max_queue개까지만 받는다.
+    작업 상태는 메모리에 보관 (job_id == doc_id, 결과 리포트는 /report/{doc_id}).
+    """
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_ANALYSES, max_queue: int = MAX_QUEUED_ANALYSES,
+                 client_quota: int = CLIENT_MAX_INFLIGHT):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.client_quota = client_quota
+        self._pool = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="analysis")
+        self._lock = threading.Lock()
+        self._inflight = 0                       # 실행 중 + 대기 중
+        self._by_client: Dict[str, int] = {}
+        self._avg_seconds = 20.0                 # 작업 소요 시간 EMA (Retry-After 추정용)
+        self.jobs: Dict[str, Dict] = {}
+
+    # ---------- admission ----------
+    def _retry_after(self, excess: int) -> int:
+        waves = (self._inflight - self.max_concurrent + excess) / self.max_concurrent
+        return max(1, int(self._avg_seconds * max(waves, 1.0) + 0.5))
+
+    def admit(self, client: str, n: int = 1) -> None:
+        """n개 작업을 한꺼번에 받을 수 있으면 슬롯 예약, 아니면 AdmissionRejected (부분 수락 없음)"""
+        with self._lock:
+            capacity = self.max_concurrent + self.max_queue
+            if self._inflight + n > capacity:
+                raise AdmissionRejected("분석 대기열이 가득 찼습니다.", self._retry_after(self._inflight + n - capacity))
+            used = self._by_client.get(client, 0)
+            if self.client_quota and used + n > self.client_quota:
+                raise AdmissionRejected(f"클라이언트 동시 분석 한도({self.client_quota})를 초과했습니다.",
+                                        self._retry_after(used + n - self.client_quota))
+            self._inflight += n
+            self._by_client[client] = used + n
+
+    def release(self, client: str, n: int = 1) -> None:
+        """예약만 하고 제출하지 못한 슬롯 반환"""
+        for _ in range(n):
+            self._release(client, None)
+
+    def _release(self, client: str, seconds: Optional[float]) -> None:
+        with self._lock:
+            self._inflight -= 1
+            left = self._by_client.get(client, 1) - 1
+            if left > 0:
+                self._by_client[client] = left
+            else:
+                self._by_client.pop(client, None)
+            if seconds is not None:
+                self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * seconds
+
+    # ---------- 실행 ----------
+    def submit(self, client: str, job_id: str, fn: Callable, *args, **meta) -> Future:
+        """admit()로 예약된 슬롯 하나를 사용해 fn(*args) 실행"""
+        with self._lock:
+            self.jobs[job_id] = {"job_id": job_id, "status": "queued", "client": client, **meta}
+            while len(self.jobs) > JOB_HISTORY:
+                oldest = next(iter(self.jobs))
+                if self.jobs[oldest]["status"] in ("queued", "running"):
+                    break
+                self.jobs.pop(oldest)
+
+        def run():
+            job = self.jobs[job_id]
+            job["status"] = "running"
+            t = time.monotonic()
+            seconds = None
+            try:
+                result = fn(*args)
+                job["status"] = "done"
+                seconds = time.monotonic() - t
+                return result
+            except Exception as e:
+                job["status"] = "error"
+                job["error"] = str(getattr(e, "detail", None) or f"{type(e).__name__}: {e}")
+                logger.warning(f"분석 작업 실패 job={job_id}: {job['error']}")
+                raise
+            finally:
+                job["seconds"] = round(time.monotonic() - t, 3)
+                self._release(client, seconds)
+
+        return self._pool.submit(run)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        job = self.jobs.get(job_id)
+        return None if job is None else {k: v for k, v in job.items() if k != "client"}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"inflight": self._inflight, "max_concurrent": self.max_concurrent,
+                    "max_queue": self.max_queue, "avg_seconds": round(self._avg_seconds, 2)}
+
+
+runner = JobRunner()
@@ -11,6 +11,9 @@ from typing import List, Dict
 from dotenv import load_dotenv
 import google.generativeai as genai
 
+from .ratelimit import RateLimiter
+from .splitters import MAX_CLAUSE_LEN
+
 # ========================== 환경 설정 ==========================
 # .env 로드 (GOOGLE_API_KEY, GEMINI_MODEL 등)
 load_dotenv()
@@ -26,7 +29,26 @@ if not API_KEY:
 DEFAULT_MODEL = (os.getenv("GEMINI_MODEL", "gemini-2.5-flash-lite") or "").strip().strip('"').strip("'")
 
 # Gemini API (API Key) 명시 구성
-genai.configure(api_key=API_KEY)
+# GEMINI_API_ENDPOINT가 있으면 해당 REST 엔드포인트로 호출 (부하 테스트용 로컬 스텁 등)
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT", "").strip()
+if GEMINI_API_ENDPOINT:
+    genai.configure(api_key=API_KEY, transport="rest", client_options={"api_endpoint": GEMINI_API_ENDPOINT})
+else:
+    genai.configure(api_key=API_KEY)
+
+# 분당 요청 수 상한 (0이면 제한 없음). 일괄 적재 시 set_rate_limiter로 프로세스 공유 리미터 주입
+LLM_RPM = float(os.getenv("LLM_RPM", "0"))
+_limiter = RateLimiter.per_minute(LLM_RPM)
+
+# 호출/파싱 실패 폴백의 reason 접두어 (risk_engine.verdicts_by_text가 재사용 대상에서 제외)
+LLM_CALL_FAILED = "Gemini 호출 실패"
+LLM_PARSE_FAILED = "Gemini 출력 파싱 실패"
+
+
+def set_rate_limiter(limiter) -> None:
+    """acquire()를 가진 리미터로 교체 (ratelimit.SharedRateLimiter 등)"""
+    global _limiter
+    _limiter = limiter
 
 # ========================== 유틸 함수 ==========================
 def _short(name: str) -> str:
@@ -82,6 +104,7 @@ def _safe_generate(model,
     마지막 실패 시 예외 전파.
     """
     for attempt in range(retries):
+        _limiter.acquire()
         try:
             resp = model.generate_content(
                 prompt,
@@ -109,19 +132,20 @@ def gemini_batch_verdicts(clause_texts: List[str]) -> List[Dict]:
     """
     전세 임대차 계약 조항 리스트를 받아, 각 항목별 위험 판단(JSON) 반환.
     - API Key 기반(REST)
-    - 입력 강제 절단(앞/뒤 200자)
+    - 입력 강제 절단(MAX_CLAUSE_LEN 초과분만 앞/뒤 보존, 분할기가 이미 상한을 보장)
     - 출력 토큰 상한(256)
     - 배치 처리(기본 5개)
     - 지수 백오프 재시도(3회)
     """
     model = _make_model(DEFAULT_MODEL)
 
-    # 입력 과대 방지: 앞/뒤만 캡쳐(토큰/쿼터 절약)
+    # 입력 과대 방지: 상한을 넘는 조항(분할기 도입 이전 리포트 재스캔 등)만 앞/뒤 캡쳐
+    limit = MAX_CLAUSE_LEN if MAX_CLAUSE_LEN > 0 else 400
     trimmed: List[str] = []
     for t in clause_texts:
         t = (t or "").strip()
-        if len(t) > 400:
-            t = t[:200] + "\n...\n" + t[-200:]
+        if len(t) > limit:
+            t = t[:limit // 2] + "\n...\n" + t[-(limit // 2):]
         trimmed.append(t)
 
     # 배치 크기: 과도한 요청/토큰 사용을 방지
@@ -146,8 +170,8 @@ def gemini_batch_verdicts(clause_texts: List[str]) -> List[Dict]:
                 base_sleep=1.1
             )
         except Exception as e:
-            # 호출 자체 실패 시, 최소한의 방어적 결과 반환
-            return [{"verdict": "watch", "reason": f"Gemini 호출 실패: {type(e).__name__}"} for _ in clause_texts]
+            # 호출 자체 실패 시 판정 보류(pending): 저장돼도 재스캔/개정본에서 재사용되지 않고 다시 판정됨
+            return [{"verdict": "pending", "reason": f"{LLM_CALL_FAILED}: {type(e).__name__}"} for _ in clause_texts]
 
         obj = _json_guard(text)
         if isinstance(obj, list):
@@ -155,8 +179,8 @@ def gemini_batch_verdicts(clause_texts: List[str]) -> List[Dict]:
         elif isinstance(obj, dict):
             results.append(obj)
         else:
-            # 파싱 실패 시 최소 watch로 채움(배치 길이만큼)
-            results.extend([{"verdict": "watch", "reason": "Gemini 출력 파싱 실패"} for _ in batch])
+            # 파싱 실패 시 판정 보류로 채움(배치 길이만큼)
+            results.extend([{"verdict": "pending", "reason": LLM_PARSE_FAILED} for _ in batch])
 
     return results
 
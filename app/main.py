@@ -1,12 +1,25 @@
 # app/main.py
-from fastapi import FastAPI, UploadFile, File, HTTPException
+import io
+import os
+import asyncio
+import zipfile
+from typing import List, Optional
+from uuid import UUID
+
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from .storage import save_upload, load_report
-from .pipeline import analyze_pdf
+from fastapi.responses import JSONResponse
+from .storage import save_upload, load_report, delete_report
+from .pipeline import analyze_pdf, delete_report_from_db
 from .schemas import UploadResponse
 from .schemas import Report
 from .storage import UPLOAD_DIR
 from .utils_pdf import pdf_to_pages
+from .clause_index import get_index
+from .jobs import runner, AdmissionRejected
+from .rules import rule_stats
+from . import risk_stats
 
 app = FastAPI(title="Contract Summary & Risk Detector (MVP)")
 
@@ -16,25 +29,191 @@ app.add_middleware(
     allow_methods=["*"], allow_headers=["*"],
 )
 
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "100"))  # /batch 1회 최대 파일 수(zip 내부 포함)
+MAX_BATCH_BYTES = int(os.getenv("MAX_BATCH_BYTES", str(200 * 2**20)))       # /batch 1회 PDF 총 바이트(압축 해제 기준)
+MAX_ZIP_MEMBER_BYTES = int(os.getenv("MAX_ZIP_MEMBER_BYTES", str(50 * 2**20)))  # zip 내부 PDF 1개 최대 크기
+# 클라이언트 식별 헤더를 믿을 프록시 IP (쉼표 구분). 비어 있으면 항상 접속 IP 기준
+TRUSTED_PROXIES = {h.strip() for h in os.getenv("TRUSTED_PROXIES", "").split(",") if h.strip()}
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected(request: Request, exc: AdmissionRejected):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": exc.reason, "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+def _client_id(request: Request) -> str:
+    # 클라이언트별 쿼터 키: 접속(peer) IP. 신뢰 프록시(TRUSTED_PROXIES)를 거친 요청만
+    # 프록시가 붙인 X-Client-Id → X-Forwarded-For(첫 항목) 순으로 사용 (직접 보낸 헤더로 쿼터 우회 방지)
+    peer = request.client.host if request.client else "unknown"
+    if peer in TRUSTED_PROXIES:
+        forwarded = (request.headers.get("x-forwarded-for") or "").split(",")[0].strip()
+        return request.headers.get("x-client-id") or forwarded or peer
+    return peer
+
+def _doc_id_or_400(doc_id: str, field: str = "doc_id") -> str:
+    # 저장 경로에 그대로 쓰이므로 UUID만 허용 (경로 조작 방지)
+    try:
+        return str(UUID(doc_id))
+    except ValueError:
+        raise HTTPException(400, f"{field} 형식이 올바르지 않습니다.")
+
 @app.post("/upload", response_model=Report)
-async def upload(file: UploadFile = File(...)) -> Report:
+async def upload(request: Request, file: UploadFile = File(...), base_doc_id: Optional[str] = None) -> Report:
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(400, "PDF만 지원합니다. (스캔본은 OCR 필요)")
+    # 개정본 비교: 기준 리포트의 동일 조항 판정 재사용 + 조항 단위 diff
+    base = None
+    if base_doc_id:
+        base_doc_id = _doc_id_or_400(base_doc_id, "base_doc_id")
+        try:
+            base = load_report(base_doc_id)
+        except FileNotFoundError:
+            raise HTTPException(404, "기준 리포트(base_doc_id)를 찾을 수 없습니다.")
     content = await file.read()
-    doc_id, path = save_upload(content, file.filename)
-    report = analyze_pdf(doc_id, path)
+    client = _client_id(request)
+    runner.admit(client)
+    try:
+        doc_id, path = save_upload(content, file.filename)
+    except Exception:
+        runner.release(client)
+        raise
+    # 분석은 작업 스레드에서 실행 (이벤트 루프 블로킹 방지 + 동시 실행 상한)
+    report = await asyncio.wrap_future(
+        runner.submit(client, doc_id, analyze_pdf, doc_id, path, base, filename=file.filename)
+    )
     return Report(**report)
 
+class _BatchBudget:
+    """/batch 1회 요청의 파일 수/총 바이트 상한. 초과 시 413 (zip은 압축을 풀기 전에 검사)"""
+
+    def __init__(self):
+        self.files = MAX_BATCH_FILES
+        self.bytes = MAX_BATCH_BYTES
+
+    def take(self, n_files: int, n_bytes: int) -> None:
+        if n_files > self.files:
+            raise HTTPException(413, f"한 번에 최대 {MAX_BATCH_FILES}개 파일까지 업로드할 수 있습니다.")
+        if n_bytes > self.bytes:
+            raise HTTPException(413, f"한 번에 최대 {MAX_BATCH_BYTES // 2**20}MB까지 업로드할 수 있습니다.")
+        self.files -= n_files
+        self.bytes -= n_bytes
+
+
+def _read_member(zf: zipfile.ZipFile, info: zipfile.ZipInfo) -> bytes:
+    # 헤더의 file_size를 믿지 않고 실제 해제량도 상한까지만 읽음
+    with zf.open(info) as f:
+        data = f.read(info.file_size + 1)
+    if len(data) > info.file_size:
+        raise HTTPException(400, f"zip 항목 크기가 헤더와 다릅니다: {info.filename}")
+    return data
+
+
+def _pdfs_from_upload(name: str, content: bytes, budget: _BatchBudget) -> List[tuple]:
+    """업로드 1건 → [(파일명, PDF bytes)]. zip이면 개수/크기를 목차(infolist)로 먼저 검사한 뒤 내부 PDF를 꺼낸다."""
+    name = name or ""
+    if name.lower().endswith(".pdf"):
+        budget.take(1, len(content))
+        return [(name, content)]
+    if name.lower().endswith(".zip"):
+        try:
+            zf = zipfile.ZipFile(io.BytesIO(content))
+        except zipfile.BadZipFile:
+            raise HTTPException(400, f"zip 파일을 열 수 없습니다: {name}")
+        members = []
+        for info in zf.infolist():
+            base = info.filename.replace("\\", "/").rsplit("/", 1)[-1]  # 경로 제거(zip slip 방지)
+            if info.is_dir() or not base.lower().endswith(".pdf") or base.startswith("."):
+                continue
+            if info.file_size > MAX_ZIP_MEMBER_BYTES:
+                raise HTTPException(413, f"zip 내부 파일이 너무 큽니다: {base}")
+            members.append((base, info))
+        budget.take(len(members), sum(info.file_size for _, info in members))
+        return [(base, _read_member(zf, info)) for base, info in members]
+    raise HTTPException(400, f"PDF 또는 zip만 지원합니다: {name}")
+
+@app.post("/batch", status_code=202)
+async def batch(request: Request, files: List[UploadFile] = File(...)):
+    # 여러 PDF(또는 zip) 업로드 → 파일별 job_id(=doc_id) 반환, 결과는 /jobs/{job_id}, /report/{doc_id}
+    budget = _BatchBudget()
+    items = []
+    for f in files:
+        content = await f.read()
+        # zip 해제는 블로킹 작업 → 스레드풀
+        items.extend(await run_in_threadpool(_pdfs_from_upload, f.filename, content, budget))
+    if not items:
+        raise HTTPException(400, "분석할 PDF가 없습니다.")
+
+    client = _client_id(request)
+    runner.admit(client, len(items))   # 전부 받거나 전부 거절(429)
+    try:
+        saved = await run_in_threadpool(_save_uploads, items)
+    except Exception:
+        runner.release(client, len(items))
+        raise
+    jobs = []
+    for name, doc_id, path in saved:
+        runner.submit(client, doc_id, analyze_pdf, doc_id, path, filename=name)
+        jobs.append({"job_id": doc_id, "filename": name, "status": "queued"})
+    return {"jobs": jobs}
+
+def _save_uploads(items: List[tuple]) -> List[tuple]:
+    out = []
+    for name, content in items:
+        doc_id, path = save_upload(content, name)
+        out.append((name, doc_id, path))
+    return out
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = runner.get(job_id)
+    if job is None:
+        raise HTTPException(404, "작업을 찾을 수 없습니다.")
+    return job
+
 @app.get("/report/{doc_id}")
 async def get_report(doc_id: str):
+    doc_id = _doc_id_or_400(doc_id)
     try:
         return load_report(doc_id)
     except FileNotFoundError:
         raise HTTPException(404, "리포트를 찾을 수 없습니다.")
 
+@app.delete("/report/{doc_id}")
+async def remove_report(doc_id: str):
+    # 리포트 파일/원본/DB 행 삭제 + 리스크 집계 차감 (조항 벡터 인덱스에는 남음)
+    doc_id = _doc_id_or_400(doc_id)
+    try:
+        delete_report(doc_id)
+    except FileNotFoundError:
+        raise HTTPException(404, "리포트를 찾을 수 없습니다.")
+    delete_report_from_db(doc_id)
+    return {"doc_id": doc_id, "deleted": True}
+
+@app.get("/stats/risks")
+async def stats_risks(top: int = 20, bucket: Optional[str] = None,
+                      since: Optional[str] = None, until: Optional[str] = None):
+    # 저장/재스캔/삭제 시 증분 갱신되는 카운터에서 응답 (전체 리포트를 읽지 않음)
+    if bucket not in (None, "day", "week", "month"):
+        raise HTTPException(400, "bucket은 day|week|month 중 하나여야 합니다.")
+    return risk_stats.summary(top=top, bucket=bucket, since=since, until=until)
+
+@app.get("/search/clauses")
+async def search_clauses(q: str, k: int = 5):
+    # 전체 리포트 조항 대상 유사 조항 검색 (영속 인덱스, memmap)
+    # 인덱스 첫 로드, 질의 임베딩(네트워크·재시도 대기), memmap 스캔, 첫 ANN 학습은 모두 블로킹 → 스레드풀에서 실행
+    if not q.strip():
+        raise HTTPException(400, "검색어(q)를 입력하세요.")
+    try:
+        hits = await run_in_threadpool(lambda: get_index().search(q, k=max(1, min(k, 50))))
+    except RuntimeError as e:
+        raise HTTPException(503, str(e))
+    return {"query": q, "results": hits}
+
 @app.get("/health")
 async def health():
-    return {"ok": True}
+    return {"ok": True, "analyses": runner.stats(), "rules": rule_stats()}
 
 @app.get("/debug/text/{doc_id}")
 async def debug_text(doc_id: str, max_pages: int = 5):
@@ -44,4 +223,4 @@ async def debug_text(doc_id: str, max_pages: int = 5):
     if not matches:
         raise HTTPException(404, "원본 PDF를 찾을 수 없습니다.")
     pages = pdf_to_pages(matches[0], max_pages=max_pages)
-    return {"pages": pages[:max_pages], "count": len(pages)}
\ No newline at end of file
+    return {"pages": pages[:max_pages], "count": len(pages)}
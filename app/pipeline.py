@@ -2,16 +2,21 @@
 # E2E 파이프라인
 
 import os
+import time
 import logging
-from typing import Dict
+from typing import Dict, List, Optional
 from uuid import UUID
 from dotenv import load_dotenv
 from fastapi import HTTPException
 
-from .utils_pdf import pdf_to_pages
-from .splitters import split_into_clauses
-from .risk_engine import summarize_with_evidence, risk_decision
+from .utils_pdf import pdf_to_pages, iter_pdf_pages, count_pages
+from .document import Document
+from .splitters import split_spans
+from .rules import apply_rules_doc, rules_fingerprint
+from .risk_engine import summarize_with_evidence, risk_decision, clause_groups
 from .storage import save_report
+from .clause_index import get_index
+from .revision import align_clauses, reuse_from_base, merge_hits, build_diff
 from .schemas import Report, Clause, Summary
 from .db import SessionLocal
 from .models import ReportORM, ClauseORM, RiskORM
@@ -20,98 +25,197 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# 이 페이지 수를 넘으면 대용량 모드(페이지 단위 스트리밍 OCR, 메모리 상한 유지)
+LARGE_DOC_THRESHOLD = int(os.getenv("LARGE_DOC_THRESHOLD", "50"))
+# 문서당 분석 페이지 상한 (일반/대용량 모드 공통). 초과분은 분석하지 않고 경고 로그
+MAX_PAGES_PER_DOC = int(os.getenv("MAX_PAGES_PER_DOC", "1000"))
 
-def analyze_pdf(doc_id: str, pdf_path: str) -> Dict:
-    """PDF → 페이지 텍스트 → 조항 분할 → 요약/리스크 → Report 생성+저장"""
-    max_pages = int(os.getenv("MAX_PAGES_PER_DOC", "50"))
-    pages = pdf_to_pages(pdf_path, max_pages=max_pages)
 
-    if not pages:
+class _Stopwatch:
+    """단계별 경과 시간 기록 (Meta.timings)"""
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self._t = time.perf_counter()
+
+    def lap(self, stage: str) -> None:
+        now = time.perf_counter()
+        self.timings[stage] = round(self.timings.get(stage, 0.0) + now - self._t, 4)
+        self._t = now
+
+
+def analyze_pdf(doc_id: str, pdf_path: str, base: Optional[Dict] = None) -> Dict:
+    """
+    PDF → 페이지 텍스트 → Document(스팬) → 조항 분할 → 요약/리스크 → Report 생성+저장
+    base(기준 리포트 dict)가 주어지면 개정본 모드: 변경 조항만 재평가하고 report.diff 포함
+    """
+    report = build_report(doc_id, pdf_path, base=base)
+    sw = _Stopwatch()
+
+    # 파일 저장 (meta.created_at이 여기서 기록됨)
+    out = report.model_dump()
+    save_report(report.doc_id, out)
+
+    # DB 저장 (설정되어 있지 않으면 스킵)
+    save_report_to_db(report)
+    sw.lap("save")
+
+    # 조항 벡터 인덱스 증분 추가 (실패해도 업로드 결과에는 영향 없음)
+    index_report(report)
+    sw.lap("index")
+
+    # 저장 단계 시간은 응답에만 포함 (저장된 리포트에는 분석 단계까지만 기록)
+    out["meta"]["timings"] = {**(out["meta"].get("timings") or {}), **sw.timings}
+    return out
+
+
+def build_report(doc_id: str, pdf_path: str, base: Optional[Dict] = None) -> Report:
+    """분석만 수행하고 저장은 하지 않음 (tools/ingest.py 등 일괄 저장 경로에서 사용)"""
+    sw = _Stopwatch()
+    # 빈 페이지도 유지해야 Clause.page가 실제 PDF 페이지 인덱스와 일치
+    total = count_pages(pdf_path)
+    if total > MAX_PAGES_PER_DOC:
+        logger.warning(f"페이지 상한 초과로 앞 {MAX_PAGES_PER_DOC}쪽만 분석: doc_id={doc_id}, pages={total}")
+    if min(total, MAX_PAGES_PER_DOC) > LARGE_DOC_THRESHOLD:
+        pages = iter_pdf_pages(pdf_path, max_pages=MAX_PAGES_PER_DOC)
+    else:
+        pages = pdf_to_pages(pdf_path, max_pages=MAX_PAGES_PER_DOC, keep_empty=True)
+
+    # 정규화 텍스트는 여기서 한 번만 만들고, 분할/룰은 오프셋으로만 동작
+    doc = Document.from_pages(pages)
+    sw.lap("extract")  # 스트리밍 모드에서는 OCR이 from_pages 소비 중에 일어나므로 여기까지가 추출
+    if not doc.text:
         raise HTTPException(
             status_code=422,
             detail="PDF에서 텍스트를 추출하지 못했습니다. (스캔본이면 OCR 설정 확인)"
         )
 
-    # ✅ 중복 호출 제거
-    clauses_text = split_into_clauses(pages)
-    if not clauses_text:
+    split_spans(doc)
+    sw.lap("split")
+    if not len(doc):
         raise HTTPException(
             status_code=422,
             detail="조항 분할에 실패했습니다. 분할 규칙을 보강해 주세요."
         )
 
-    clauses = [Clause(id=i, text=t, page=0) for i, t in enumerate(clauses_text)]
+    clauses_text = doc.clause_texts()
+    clauses = [
+        Clause(id=i, text=t, page=doc.page_of(s), start=s, end=e)
+        for i, (t, (s, e)) in enumerate(zip(clauses_text, doc.spans()))
+    ]
 
     summary_dict = summarize_with_evidence(clauses_text)
-    risks_dicts = risk_decision(clauses_text)   # dict 리스트 반환 → Pydantic이 검증/캐스팅
+    # 문서 내 중복 조항(첨부 재기재, 중복 페이지 등)은 대표 조항만 룰/LLM → 결과는 모든 사본 evidence_ids로
+    groups = clause_groups(clauses_text)
+    canonical = set(groups)
+    diff = None
+    if base is None:
+        hits = apply_rules_doc(doc, only=canonical)
+        sw.lap("rules")
+        # dict 리스트 반환 → Pydantic이 검증/캐스팅
+        risks_dicts = risk_decision(clauses_text, rule_hits=hits, groups=groups)
+        sw.lap("llm")
+    else:
+        # 개정본: 기준 리포트와 조항 정렬 → 동일 조항은 히트/LLM 판정 재사용, 변경·추가 조항만 룰/LLM
+        alignment = align_clauses(base.get("clauses") or [], clauses_text)
+        reused, rerun, known = reuse_from_base(base, clauses_text, alignment)
+        sw.lap("align")
+        hits = merge_hits(reused, apply_rules_doc(doc, only=rerun & canonical))
+        sw.lap("rules")
+        risks_dicts = risk_decision(clauses_text, rule_hits=hits, known_verdicts=known, groups=groups)
+        sw.lap("llm")
+        diff = build_diff(base, risks_dicts, len(clauses_text), alignment)
+        sw.lap("align")
 
-    report = Report(
+    return Report(
         doc_id=doc_id,
         summary=Summary(**summary_dict),
         risks=[r for r in risks_dicts],
         clauses=clauses,
-        meta={"pages": len(pages), "file_path": pdf_path},
+        meta={"pages": doc.num_pages, "file_path": pdf_path, "rules_version": rules_fingerprint(),
+              "timings": sw.timings},
+        diff=diff,
     )
 
-    # 파일 저장
-    save_report(report.doc_id, report.model_dump())
-    
-    # DB 저장 (설정되어 있지 않으면 스킵)
-    save_report_to_db(report)
 
-    return report.model_dump()
+def index_report(report: Report) -> None:
+    """전체 코퍼스 조항 인덱스(/search/clauses)에 새 리포트 조항 추가"""
+    if os.getenv("CLAUSE_INDEX_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return
+    try:
+        get_index().add_report(report.model_dump(mode="json"))
+    except Exception as e:
+        logger.warning(f"조항 인덱스 추가 실패: {e}")
+
+
+def _risk_orm(k, report_id=None) -> RiskORM:
+    return RiskORM(
+        report_id=report_id,
+        clause_id=(k.evidence_ids[0] if k.evidence_ids else None),
+        type=k.type,
+        severity=k.severity,
+        llm_verdict=k.llm_verdict,   # 'risky|watch|ok|pending' 준수
+        reason=k.reason,
+        rule_hits=k.rule_hits,       # ARRAY(Text)
+        evidence_ids=k.evidence_ids  # ARRAY(Integer)
+    )
 
 
 def save_report_to_db(report: Report) -> None:
     """Pydantic Report → ORM 저장. Postgres(ARRAY) 기준."""
+    save_reports_to_db([report])
+
+
+def save_reports_to_db(reports: List[Report]) -> None:
+    """여러 Report를 한 세션/트랜잭션으로 저장 (일괄 적재용). 같은 id가 이미 있으면 건너뛰어 재실행해도 안전."""
+    if not reports:
+        return
     # DB 미연결 시 안전 스킵
     if SessionLocal is None:
         logger.warning("DATABASE_URL not set or DB session not initialized. Skip saving.")
         return
 
-    # ORM의 id가 UUID 컬럼이면 문자열을 UUID로 변환
-    try:
-        rid = UUID(str(report.doc_id))
-    except Exception as e:
-        logger.error(f"UUID 변환 실패: {e}")
-        raise ValueError("report.doc_id는 UUID 형식이어야 합니다.")
+    rows = []
+    for report in reports:
+        # ORM의 id가 UUID 컬럼이면 문자열을 UUID로 변환
+        try:
+            rid = UUID(str(report.doc_id))
+        except Exception as e:
+            logger.error(f"UUID 변환 실패: {e}")
+            raise ValueError("report.doc_id는 UUID 형식이어야 합니다.")
 
-    db = SessionLocal()
-    try:
-        # 상단 Report
-        r = ReportORM(
+        # 상단 Report (clauses/risks는 relationship으로 함께 flush)
+        rows.append(ReportORM(
             id=rid,
             one_line_summary=report.summary.one_line,
             bullets=report.summary.bullets,   # ARRAY(Text) → Postgres 필요
             pages=report.meta.pages,
-            file_path=report.meta.file_path
-        )
-        db.add(r)
-        db.flush()  # PK 확정
-
-        # Clauses
-        for c in report.clauses:
-            db.add(ClauseORM(
-                report_id=rid,
-                page=c.page,
-                text=c.text,
-                start_pos=c.start,
-                end_pos=c.end
-            ))
-
-        # Risks
-        for k in report.risks:
-            db.add(RiskORM(
-                report_id=rid,
-                clause_id=(k.evidence_ids[0] if k.evidence_ids else None),
-                type=k.type,
-                severity=k.severity,
-                llm_verdict=k.llm_verdict,   # 'risky|watch|ok|pending' 준수
-                reason=k.reason,
-                rule_hits=k.rule_hits,       # ARRAY(Text)
-                evidence_ids=k.evidence_ids  # ARRAY(Integer)
-            ))
+            file_path=report.meta.file_path,
+            clauses=[
+                ClauseORM(
+                    page=c.page,
+                    text=c.text,
+                    start_pos=c.start,
+                    end_pos=c.end
+                )
+                for c in report.clauses
+            ],
+            risks=[_risk_orm(k) for k in report.risks],
+        ))
 
+    db = SessionLocal()
+    try:
+        # 멱등 저장: 이미 있는 id(재개/재시도된 일괄 적재의 uuid5 doc_id 등)는 건너뜀
+        ids = [r.id for r in rows]
+        existing = {rid for (rid,) in db.query(ReportORM.id).filter(ReportORM.id.in_(ids))}
+        new_rows, seen = [], set(existing)
+        for r in rows:
+            if r.id not in seen:
+                seen.add(r.id)
+                new_rows.append(r)
+        if existing:
+            logger.info(f"DB에 이미 있는 리포트 {len(existing)}건 건너뜀")
+        db.add_all(new_rows)
         db.commit()
     except Exception as e:
         db.rollback()
@@ -119,3 +223,46 @@ def save_report_to_db(report: Report) -> None:
         raise
     finally:
         db.close()
+
+
+def replace_risks_in_db(updates: Dict[str, List]) -> None:
+    """{doc_id: [RiskItem]} → 해당 리포트의 리스크 행을 교체 (재스캔 결과 반영, 한 트랜잭션)"""
+    if not updates:
+        return
+    if SessionLocal is None:
+        logger.warning("DATABASE_URL not set or DB session not initialized. Skip saving.")
+        return
+
+    db = SessionLocal()
+    try:
+        for doc_id, risks in updates.items():
+            rid = UUID(str(doc_id))
+            db.query(RiskORM).filter(RiskORM.report_id == rid).delete(synchronize_session=False)
+            db.add_all([_risk_orm(k, report_id=rid) for k in risks])
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"DB 리스크 교체 실패: {e}")
+        raise
+    finally:
+        db.close()
+
+
+def delete_report_from_db(doc_id: str) -> None:
+    """리포트와 조항/리스크 행 삭제 (cascade)"""
+    if SessionLocal is None:
+        logger.warning("DATABASE_URL not set or DB session not initialized. Skip deleting.")
+        return
+
+    db = SessionLocal()
+    try:
+        row = db.get(ReportORM, UUID(str(doc_id)))
+        if row is not None:
+            db.delete(row)
+            db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"DB 리포트 삭제 실패: {e}")
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,71 @@
+# app/ratelimit.py
+# 외부 API(Gemini) 호출 속도 제한: 스레드 안전 토큰 버킷
+
+import multiprocessing as mp
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    초당 rate개 토큰을 채우는 토큰 버킷(최대 burst개 저장).
+    acquire()는 토큰이 생길 때까지 대기. rate<=0 이면 제한 없음.
+    """
+
+    def __init__(self, rate_per_sec: float, burst: int = 1):
+        self.rate = float(rate_per_sec)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, rpm: float, burst: int = 1) -> "RateLimiter":
+        return cls(rpm / 60.0, burst)
+
+    def acquire(self, n: float = 1.0) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= n:
+                    self._tokens -= n
+                    return
+                wait = (n - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class SharedRateLimiter:
+    """
+    여러 프로세스가 공유하는 토큰 버킷 (multiprocessing.Value/Lock).
+    부모에서 만들고 Pool/ProcessPoolExecutor의 initargs로 넘겨 자식 프로세스가 상속.
+    """
+
+    def __init__(self, rate_per_sec: float, burst: int = 1):
+        self.rate = float(rate_per_sec)
+        self.burst = max(1, int(burst))
+        self._lock = mp.Lock()
+        self._tokens = mp.Value("d", float(self.burst), lock=False)
+        self._last = mp.Value("d", time.time(), lock=False)  # 프로세스 간 공통 시계(wall clock)
+
+    @classmethod
+    def per_minute(cls, rpm: float, burst: int = 1) -> "SharedRateLimiter":
+        return cls(rpm / 60.0, burst)
+
+    def acquire(self, n: float = 1.0) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.time()
+                elapsed = max(0.0, now - self._last.value)
+                self._tokens.value = min(self.burst, self._tokens.value + elapsed * self.rate)
+                self._last.value = now
+                if self._tokens.value >= n:
+                    self._tokens.value -= n
+                    return
+                wait = (n - self._tokens.value) / self.rate
+            time.sleep(wait)
@@ -0,0 +1,83 @@
+# app/rescan.py
+# RISK_RULES 변경 시 저장 리포트 증분 재스캔
+# - OCR/분할 없이 저장된 조항 텍스트에 apply_rules만 다시 실행
+# - 룰 히트 집합이 달라진 리포트만 리스크 재계산, 텍스트·type이 같은 항목의 LLM 판정은 재사용
+
+import json
+import os
+from typing import Dict, List, Set, Tuple
+
+from . import risk_stats
+from .rules import apply_rules
+from .risk_engine import risk_decision, verdicts_by_text, known_verdicts_for
+
+HitKey = Tuple[int, str, str]  # (clause_id, type, pattern)
+
+
+def hit_set(hits: List[Dict]) -> Set[HitKey]:
+    return {(h["clause_id"], h["type"], h["pattern"]) for h in hits}
+
+
+def hit_set_from_risks(risks: List[Dict]) -> Set[HitKey]:
+    """저장된 리스크 → 당시의 룰 히트 집합 (LLM 폴백 항목 제외)"""
+    out: Set[HitKey] = set()
+    for r in risks:
+        if r.get("type") == "llm_flag":
+            continue
+        for cid in r.get("evidence_ids") or []:
+            for pat in r.get("rule_hits") or []:
+                out.add((cid, r["type"], pat))
+    return out
+
+
+def rescan_report(report: Dict, fingerprint: str, force: bool = False) -> str:
+    """
+    리포트 dict를 제자리에서 갱신하고 상태 반환.
+    - "current":   이미 현재 룰 지문으로 생성됨 (변경 없음)
+    - "unchanged": 룰은 바뀌었지만 이 리포트의 히트 집합은 동일 → meta.rules_version만 갱신
+    - "changed":   히트 집합이 달라져 risks 재계산
+    """
+    meta = report.setdefault("meta", {})
+    if not force and meta.get("rules_version") == fingerprint:
+        return "current"
+
+    clauses = sorted(report.get("clauses") or [], key=lambda c: c["id"])
+    texts = [c["text"] for c in clauses]
+    hits = apply_rules(texts)
+    old_risks = report.get("risks") or []
+    meta["rules_version"] = fingerprint
+    if hit_set(hits) == hit_set_from_risks(old_risks):
+        return "unchanged"
+
+    # 텍스트가 그대로인 조항은 저장된 LLM 판정 재사용 → 새로 후보가 된 조항만 LLM 호출
+    known = known_verdicts_for(dict(enumerate(texts)), verdicts_by_text(clauses, old_risks))
+    report["risks"] = risk_decision(texts, rule_hits=hits, known_verdicts=known)
+    return "changed"
+
+
+def rescan_file(path: str, fingerprint: str, force: bool = False, write: bool = True) -> Dict:
+    """리포트 파일 1개 재스캔 (프로세스 풀 작업 단위)"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            report = json.load(f)
+        old_risks = report.get("risks") or []
+        status = rescan_report(report, fingerprint, force=force)
+        if write and status != "current":
+            st = os.stat(path)
+            with risk_stats.transaction() as deltas:
+                tmp = path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(report, f, ensure_ascii=False, indent=2)
+                os.replace(tmp, path)
+                if status == "unchanged":
+                    # 내용(리스크)은 그대로 → mtime 유지해서 증분 내보내기(export) 대상에서 제외
+                    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+                if status == "changed":
+                    # 집계 카운터 보정: 이전 리스크 기여분 차감 후 새 리스크 반영
+                    deltas.extend(risk_stats.saved_deltas(report, previous={**report, "risks": old_risks}))
+        out = {"doc_id": str(report.get("doc_id")), "status": status}
+        if status == "changed":
+            out["risks"] = report["risks"]
+        return out
+    except Exception as e:
+        return {"doc_id": os.path.basename(path)[:-5], "status": "error", "error": f"{type(e).__name__}: {e}"}
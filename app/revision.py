@@ -0,0 +1,126 @@
+# app/revision.py
+# 계약서 개정본 비교: 기준 리포트 조항과 새 버전 조항 정렬 → 변경 조항만 룰/LLM 재평가 + 조항 단위 diff
+
+import os
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Set, Tuple
+
+from .rules import rule_order, rules_fingerprint
+from .risk_engine import clause_key, known_verdicts_for, verdicts_by_text
+from .rescan import hit_set_from_risks
+
+# 이 유사도 이상이면 같은 조항의 수정본으로 간주 (미만이면 삭제+추가)
+DIFF_FUZZY_THRESHOLD = float(os.getenv("DIFF_FUZZY_THRESHOLD", "0.6"))
+
+Alignment = Dict[int, Tuple[int, float]]  # 새 clause_id → (기준 clause_id, 유사도)
+
+
+def align_clauses(base_clauses: List[Dict], new_texts: List[str],
+                  threshold: float = DIFF_FUZZY_THRESHOLD) -> Alignment:
+    """
+    1) 공백 무시 해시가 같은 조항끼리 정확 매칭 (유사도 1.0)
+    2) 남은 조항은 SequenceMatcher 유사도로 탐욕 매칭 (quick_ratio로 후보 선별)
+    """
+    by_key: Dict[str, List[int]] = {}
+    for c in sorted(base_clauses, key=lambda c: c["id"]):
+        by_key.setdefault(clause_key(c["text"]), []).append(c["id"])
+
+    mapping: Alignment = {}
+    used: Set[int] = set()
+    for nid, t in enumerate(new_texts):
+        ids = by_key.get(clause_key(t))
+        if ids:
+            bid = ids.pop(0)
+            mapping[nid] = (bid, 1.0)
+            used.add(bid)
+
+    base_left = [c for c in base_clauses if c["id"] not in used]
+    for nid, t in enumerate(new_texts):
+        if nid in mapping or not base_left:
+            continue
+        sm = SequenceMatcher(None, autojunk=False)
+        sm.set_seq2(t)
+        best: Optional[Tuple[float, Dict]] = None
+        for c in base_left:
+            sm.set_seq1(c["text"])
+            if sm.real_quick_ratio() < threshold or sm.quick_ratio() < threshold:
+                continue
+            r = sm.ratio()
+            if r >= threshold and (best is None or r > best[0]):
+                best = (r, c)
+        if best is not None:
+            mapping[nid] = (best[1]["id"], round(best[0], 4))
+            base_left.remove(best[1])
+    return mapping
+
+
+def reuse_from_base(base: Dict, new_texts: List[str], alignment: Alignment):
+    """
+    변경 없는 조항(정확 매칭)의 룰 히트/LLM 판정을 기준 리포트에서 가져옴.
+    반환: (재사용 히트 리스트, 룰을 다시 돌려야 할 조항 id 집합, known_verdicts)
+    기준 리포트가 다른 룰 버전으로 만들어졌다면 히트는 재사용하지 않고 전체 재매칭.
+    """
+    unchanged = {nid: bid for nid, (bid, sim) in alignment.items() if sim == 1.0}
+    base_risks = base.get("risks") or []
+
+    cache = verdicts_by_text(base.get("clauses") or [], base_risks)
+    known = known_verdicts_for({nid: new_texts[nid] for nid in unchanged}, cache)
+
+    if (base.get("meta") or {}).get("rules_version") != rules_fingerprint():
+        return [], set(range(len(new_texts))), known
+
+    base_hits: Dict[int, List[Tuple[str, str]]] = {}
+    for cid, rtype, pat in hit_set_from_risks(base_risks):
+        base_hits.setdefault(cid, []).append((rtype, pat))
+    reused = [
+        {"type": rtype, "clause_id": nid, "pattern": pat}
+        for nid, bid in unchanged.items()
+        for rtype, pat in base_hits.get(bid, [])
+    ]
+    rerun = set(range(len(new_texts))) - set(unchanged)
+    return reused, rerun, known
+
+
+def merge_hits(reused: List[Dict], fresh: List[Dict]) -> List[Dict]:
+    """apply_rules 전체 실행과 같은 순서(조항 → RISK_RULES 순)로 정렬"""
+    order = rule_order()
+    return sorted(reused + fresh, key=lambda h: (h["clause_id"], order.get((h["type"], h["pattern"]), len(order))))
+
+
+def build_diff(base: Dict, new_risks: List[Dict], n_new: int, alignment: Alignment) -> Dict:
+    """
+    조항 단위 diff + 리스크 type 증감 (schemas.ReportDiff 형식 dict).
+    llm_flag(룰 히트 없이 LLM 판정용으로 넣은 상위 조항)는 리스크 type 변화가 아니므로 증감에서 제외.
+    """
+    def types_by_clause(risks):
+        out: Dict[int, Set[str]] = {}
+        for r in risks:
+            if r.get("type") == "llm_flag":
+                continue
+            for cid in r.get("evidence_ids") or []:
+                out.setdefault(cid, set()).add(r["type"])
+        return out
+
+    base_types = types_by_clause(base.get("risks") or [])
+    new_types = types_by_clause(new_risks)
+    changes = []
+    for nid in range(n_new):
+        if nid in alignment:
+            bid, sim = alignment[nid]
+            status = "unchanged" if sim == 1.0 else "modified"
+        else:
+            bid, sim, status = None, None, "added"
+        before = base_types.get(bid, set()) if bid is not None else set()
+        after = new_types.get(nid, set())
+        changes.append({"status": status, "clause_id": nid, "base_clause_id": bid, "similarity": sim,
+                        "risks_added": sorted(after - before), "risks_removed": sorted(before - after)})
+    matched = {bid for bid, _ in alignment.values()}
+    for c in sorted(base.get("clauses") or [], key=lambda c: c["id"]):
+        if c["id"] not in matched:
+            changes.append({"status": "removed", "clause_id": None, "base_clause_id": c["id"], "similarity": None,
+                            "risks_added": [], "risks_removed": sorted(base_types.get(c["id"], set()))})
+
+    counts = {s: 0 for s in ("unchanged", "modified", "added", "removed")}
+    for ch in changes:
+        counts[ch["status"]] += 1
+    return {"base_doc_id": str(base.get("doc_id")), "counts": counts, "changes": changes}
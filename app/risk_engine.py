@@ -1,8 +1,8 @@
 # app/risk_engine.py
-import os, json, http.client, time, unicodedata, re
-from typing import List, Dict
+import os, json, http.client, time, unicodedata, re, hashlib
+from typing import List, Dict, Optional, Tuple
 from .rules import apply_rules
-from .llm_client_gemini import gemini_batch_verdicts
+from .llm_client_gemini import gemini_batch_verdicts, LLM_CALL_FAILED, LLM_PARSE_FAILED
 
 # ==== 1) 리스크 기본 매핑(그대로 사용/보강 가능) ====
 SEVERITY_BY_TYPE: Dict[str, str] = {
@@ -33,38 +33,107 @@ DESCRIPTION_BY_TYPE: Dict[str, str] = {
 def _normalize_ko(s: str) -> str:
     return (s or "").replace("\u00A0"," ").strip()
 
+def clause_key(text: str) -> str:
+    """공백 차이를 무시한 조항 텍스트 해시 (LLM 판정 재사용 키)"""
+    return hashlib.sha1(" ".join((text or "").split()).encode("utf-8")).hexdigest()
+
+def clause_groups(clauses: List[str]) -> Dict[int, List[int]]:
+    """
+    문서 내 중복 조항 묶기 (완전 일치 + 공백 차이 무시).
+    반환: {대표 clause_id(첫 등장): [대표 포함 같은 텍스트의 clause_id 전체]} — 중복이 아닌 조항도 포함
+    """
+    first: Dict[str, int] = {}
+    groups: Dict[int, List[int]] = {}
+    for i, t in enumerate(clauses):
+        cid = first.setdefault(clause_key(t), i)
+        groups.setdefault(cid, []).append(i)
+    return groups
+
+def _llm_failed(verdict: str, reason: str) -> bool:
+    # 예전 리포트는 호출/파싱 실패를 "watch"로 저장했으므로 reason으로도 판별
+    return verdict == "pending" or reason.startswith((LLM_CALL_FAILED, LLM_PARSE_FAILED))
+
+def verdicts_by_text(clauses: List[Dict], risks: List[Dict]) -> Dict[Tuple[str, str], Dict]:
+    """
+    저장된 리포트의 (clauses, risks) → {(clause_key, 리스크 type): {"verdict","reason"}}.
+    실제 LLM 판정이 있었던 항목만 포함 (pending, Gemini 호출/파싱 실패 폴백 제외).
+    reason이 type 설명으로 채워졌을 수 있어 type별로 따로 보관.
+    """
+    text_by_id = {c["id"]: c["text"] for c in clauses}
+    out: Dict[Tuple[str, str], Dict] = {}
+    for r in risks:
+        verdict = r.get("llm_verdict") or "pending"
+        reason = r.get("reason") or ""
+        if _llm_failed(verdict, reason):
+            continue
+        for cid in r.get("evidence_ids") or []:
+            if cid in text_by_id:
+                out.setdefault((clause_key(text_by_id[cid]), r["type"]), {"verdict": verdict, "reason": reason})
+    return out
+
+def known_verdicts_for(texts: Dict[int, str], cache: Dict[Tuple[str, str], Dict]) -> Dict[int, Dict[str, Dict]]:
+    """{clause_id: 텍스트} + verdicts_by_text 결과 → risk_decision의 known_verdicts ({clause_id: {type: 판정}})"""
+    by_key: Dict[str, Dict[str, Dict]] = {}
+    for (key, rtype), v in cache.items():
+        by_key.setdefault(key, {})[rtype] = v
+    known: Dict[int, Dict[str, Dict]] = {}
+    for cid, t in texts.items():
+        v = by_key.get(clause_key(t))
+        if v:
+            known[cid] = v
+    return known
+
 def summarize_with_evidence(clauses: List[str]) -> Dict:
     bullets = [f"- {c[:100]}... [evidence:{i}]" for i, c in enumerate(clauses[:5])]
     return {"one_line": "초안 요약(LLM 연결 전)", "bullets": bullets}
 
-def risk_decision(clauses: List[str]):
-    rule_hits = apply_rules(clauses)
+def risk_decision(clauses: List[str], rule_hits: Optional[List[Dict]] = None,
+                  known_verdicts: Optional[Dict[int, Dict]] = None,
+                  groups: Optional[Dict[int, List[int]]] = None):
+    # 스팬 기반으로 미리 계산된 히트가 있으면 재사용 (rules.apply_rules_doc)
+    if rule_hits is None:
+        rule_hits = apply_rules(clauses)
+    # clause_id → {type: 이전 LLM 결과({"verdict","reason"})}. 현재 히트 type이 모두 있는 조항만 LLM에 다시 보내지 않음
+    known_verdicts = known_verdicts or {}
+    # 중복 조항: 대표 조항만 판정하고 evidence_ids로 모든 사본에 펼침 (clause_groups)
+    if groups is None:
+        groups = clause_groups(clauses)
 
     # 룰 히트 조항만 LLM 보냄 (없으면 상위 5개 조항)
     by_clause: Dict[int, List[Dict]] = {}
     for h in rule_hits:
-        by_clause.setdefault(h["clause_id"], []).append(h)
+        if h["clause_id"] in groups:
+            by_clause.setdefault(h["clause_id"], []).append(h)
 
-    clause_ids = sorted(by_clause.keys()) or list(range(min(5, len(clauses))))
-    candidate_texts = [clauses[i] for i in clause_ids]
+    clause_ids = sorted(by_clause.keys()) or sorted(groups)[:5]
+    fallback = [{"type":"llm_flag","pattern":"llm_fallback"}]
+    ask_ids = [cid for cid in clause_ids
+               if not {h["type"] for h in by_clause.get(cid) or fallback} <= set(known_verdicts.get(cid) or {})]
+    candidate_texts = [clauses[i] for i in ask_ids]
 
     use_gemini = os.getenv("LLM_PROVIDER","gemini").lower() == "gemini" and os.getenv("GOOGLE_API_KEY")
-    llm_results = gemini_batch_verdicts(candidate_texts) if use_gemini else []
+    llm_results = gemini_batch_verdicts(candidate_texts) if use_gemini and candidate_texts else []
 
     # 길이 보정
-    while len(llm_results) < len(clause_ids):
+    while len(llm_results) < len(ask_ids):
         llm_results.append({"verdict":"pending","reason":"LLM 미사용/누락"})
+    llm_by_clause = dict(zip(ask_ids, llm_results))
 
     results = []
-    for idx, cid in enumerate(clause_ids):
-        llm_obj = llm_results[idx] if idx < len(llm_results) else {"verdict":"pending","reason":""}
-        llm_verdict = (llm_obj.get("llm_verdict") or "pending").lower()
-        llm_reason  = _normalize_ko(llm_obj.get("reason") or "")
-
-        hits = by_clause.get(cid) or [{"type":"llm_flag","pattern":"llm_fallback"}]
+    for cid in clause_ids:
+        hits = by_clause.get(cid) or fallback
 
         for h in hits:
             rtype = h["type"]
+            if cid in llm_by_clause:
+                llm_obj = llm_by_clause[cid]
+            else:
+                llm_obj = (known_verdicts.get(cid) or {}).get(rtype) or {"verdict":"pending","reason":""}
+            llm_verdict = (llm_obj.get("llm_verdict") or llm_obj.get("verdict") or "pending").lower()
+            if llm_verdict not in ("risky", "watch", "ok", "pending"):
+                llm_verdict = "pending"
+            llm_reason  = _normalize_ko(llm_obj.get("reason") or "")
+
             base_sev = SEVERITY_BY_TYPE.get(rtype, "watch")
             desc = DESCRIPTION_BY_TYPE.get(rtype, "전세 임대차 기준의 일반적 유의사항입니다.")
             sev = base_sev if rtype != "llm_flag" else ("high" if llm_verdict=="risky" else "watch")
@@ -76,7 +145,7 @@ def risk_decision(clauses: List[str]):
                 "rule_hits": [h.get("pattern","llm_fallback")],
                 "llm_verdict": llm_verdict,              # ✅ Pydantic 허용값
                 "reason": reason,
-                "evidence_ids": [cid],
+                "evidence_ids": list(groups.get(cid) or [cid]),
             })
     return _dedupe_risks(results)
 
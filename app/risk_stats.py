@@ -0,0 +1,191 @@
+# app/risk_stats.py
+# 리스크 집계 카운터 (GET /stats/risks)
+# - 리포트 저장/재스캔/삭제 시 증감분(delta)만 반영 → 조회 비용이 코퍼스 크기와 무관
+# - 파일 1개(JSON) + 프로세스 간 잠금: uvicorn 워커, tools.ingest, tools.rescan이 함께 갱신
+
+import glob
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from .filelock import file_lock
+
+STATS_PATH = os.getenv("RISK_STATS_PATH", os.path.join(os.getenv("STORAGE_DIR", "./data"), "risk_stats.json"))
+
+_SEP = "\t"  # 키 구분자 (type/pattern에 나오지 않는 문자)
+_cache_lock = threading.Lock()
+_cache: Dict = {"sig": None, "data": None}
+
+
+def _empty() -> Dict:
+    return {"docs": 0, "risks": 0, "cube": {}, "patterns": {}, "daily": {}, "updated_at": None}
+
+
+def _day(report: Dict) -> str:
+    s = (report.get("meta") or {}).get("created_at")
+    try:
+        return datetime.fromisoformat(s.replace("Z", "+00:00")).astimezone(timezone.utc).strftime("%Y-%m-%d")
+    except (AttributeError, ValueError):
+        return "unknown"  # created_at 도입 이전 리포트
+
+
+def _bump(d: Dict, key: str, n: int) -> None:
+    v = d.get(key, 0) + n
+    if v:
+        d[key] = v
+    else:
+        d.pop(key, None)
+
+
+def report_delta(report: Dict, sign: int = 1) -> Dict:
+    """리포트 1건이 집계에 기여하는 양 (sign=-1이면 제거분)"""
+    delta = _empty()
+    day = {"docs": sign, "risks": 0, "cube": {}}
+    delta["docs"] = sign
+    for r in report.get("risks") or []:
+        cube_key = _SEP.join((r.get("type") or "", r.get("severity") or "", r.get("llm_verdict") or "pending"))
+        _bump(delta["cube"], cube_key, sign)
+        _bump(day["cube"], cube_key, sign)
+        for pat in r.get("rule_hits") or []:
+            _bump(delta["patterns"], _SEP.join((r.get("type") or "", pat)), sign)
+        delta["risks"] += sign
+        day["risks"] += sign
+    delta["daily"][_day(report)] = day
+    return delta
+
+
+def _merge(into: Dict, delta: Dict) -> None:
+    into["docs"] += delta["docs"]
+    into["risks"] += delta["risks"]
+    for k, n in delta["cube"].items():
+        _bump(into["cube"], k, n)
+    for k, n in delta["patterns"].items():
+        _bump(into["patterns"], k, n)
+    for day, dd in delta["daily"].items():
+        cur = into["daily"].setdefault(day, {"docs": 0, "risks": 0, "cube": {}})
+        cur["docs"] += dd["docs"]
+        cur["risks"] += dd["risks"]
+        for k, n in dd["cube"].items():
+            _bump(cur["cube"], k, n)
+        if not cur["docs"] and not cur["risks"] and not cur["cube"]:
+            into["daily"].pop(day)
+
+
+def _read(path: str) -> Dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return _empty()
+
+
+def _write(path: str, data: Dict) -> None:
+    data["updated_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(path + ".tmp", path)
+
+
+@contextmanager
+def transaction(path: str = STATS_PATH):
+    """
+    카운터 잠금을 잡은 채로 yield한 리스트에 delta를 모았다가 끝날 때 한 번에 반영.
+    리포트 파일 읽기/쓰기도 이 안에서 하면 같은 doc_id 동시 저장이 이중 집계되지 않는다.
+    """
+    d = os.path.dirname(path)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    with file_lock(path + ".lock"):
+        deltas: List[Dict] = []
+        yield deltas
+        if deltas:
+            data = _read(path)
+            for delta in deltas:
+                _merge(data, delta)
+            _write(path, data)
+
+
+def apply(*deltas: Dict, path: str = STATS_PATH) -> None:
+    """delta들을 잠금 안에서 한 번에 반영"""
+    with transaction(path) as pending:
+        pending.extend(deltas)
+
+
+def saved_deltas(report: Dict, previous: Optional[Dict] = None) -> List[Dict]:
+    """새 리포트 저장분 (같은 doc_id를 덮어쓰면 previous의 기여분을 빼고 반영)"""
+    deltas = [report_delta(report)]
+    if previous is not None:
+        deltas.insert(0, report_delta(previous, -1))
+    return deltas
+
+
+def rebuild(report_dir: str, path: str = STATS_PATH) -> Dict:
+    """저장된 리포트 전체로 카운터 재계산 (최초 도입/불일치 복구용, 적재 작업이 없을 때 실행)"""
+    with file_lock(path + ".lock"):
+        data = _empty()
+        for p in glob.glob(os.path.join(report_dir, "*.json")):
+            report = _read(p)
+            if report.get("doc_id"):
+                _merge(data, report_delta(report))
+        _write(path, data)
+    return data
+
+
+# ---------- 조회 ----------
+def load(path: str = STATS_PATH) -> Dict:
+    """파일이 바뀌었을 때만 다시 읽음 (stat 1회)"""
+    try:
+        st = os.stat(path)
+        sig = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return _empty()
+    with _cache_lock:
+        if _cache["sig"] != sig:
+            _cache["data"], _cache["sig"] = _read(path), sig
+        return _cache["data"]
+
+
+def _bucket_of(day: str, bucket: str) -> str:
+    if bucket == "day" or day == "unknown":
+        return day
+    d = date.fromisoformat(day)
+    if bucket == "week":
+        return (d - timedelta(days=d.weekday())).isoformat()  # 주 시작(월요일)
+    return day[:7]  # month
+
+
+def _cube_rows(cube: Dict[str, int]) -> List[Dict]:
+    rows = []
+    for k, n in cube.items():
+        rtype, severity, verdict = k.split(_SEP)
+        rows.append({"type": rtype, "severity": severity, "llm_verdict": verdict, "count": n})
+    rows.sort(key=lambda r: (-r["count"], r["type"], r["severity"], r["llm_verdict"]))
+    return rows
+
+
+def summary(top: int = 20, bucket: Optional[str] = None, since: Optional[str] = None,
+            until: Optional[str] = None, path: str = STATS_PATH) -> Dict:
+    """GET /stats/risks 응답. bucket: None | "day" | "week" | "month" (since/until: YYYY-MM-DD, 포함)"""
+    data = load(path)
+    patterns = sorted(data["patterns"].items(), key=lambda kv: (-kv[1], kv[0]))[:max(0, top)]
+    out = {
+        "docs": data["docs"], "risks": data["risks"], "updated_at": data.get("updated_at"),
+        "counts": _cube_rows(data["cube"]),
+        "top_patterns": [{"type": k.split(_SEP)[0], "pattern": k.split(_SEP)[1], "count": n} for k, n in patterns],
+    }
+    if bucket:
+        merged: Dict[str, Dict] = {}
+        for day, dd in data["daily"].items():
+            if day != "unknown" and ((since and day < since) or (until and day > until)):
+                continue
+            b = merged.setdefault(_bucket_of(day, bucket), {"docs": 0, "risks": 0, "cube": {}})
+            b["docs"] += dd["docs"]
+            b["risks"] += dd["risks"]
+            for k, n in dd["cube"].items():
+                _bump(b["cube"], k, n)
+        out["buckets"] = [{"bucket": k, "docs": v["docs"], "risks": v["risks"], "counts": _cube_rows(v["cube"])}
+                          for k, v in sorted(merged.items())]
+    return out
@@ -1,6 +1,25 @@
 # app/rules.py
+import os
 import re
-from typing import Dict, List
+import json
+import time
+import hashlib
+import logging
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional, Set
+
+try:
+    import regex  # 매치별 타임아웃 지원 (requirements 고정)
+except ImportError:
+    regex = None
+
+logger = logging.getLogger(__name__)
+
+# 매칭 엔진: "re"(기본) | "regex"(패턴별 타임아웃으로 백트래킹 폭주 차단)
+RULES_ENGINE = os.getenv("RULES_ENGINE", "re").lower()
+RULE_TIMEOUT_MS = float(os.getenv("RULE_TIMEOUT_MS", "50"))  # regex 엔진에서 매치 1회 상한
+RULE_SLOW_MS = float(os.getenv("RULE_SLOW_MS", "10"))        # 이보다 오래 걸린 매치는 로그/집계
 
 # -----------------------------
 # 위험 패턴 정의 (정규식)
@@ -139,9 +158,114 @@ RISK_RULES.update({
     ],
 })
 
+def rules_fingerprint() -> str:
+    """현재 RISK_RULES 내용의 지문. 리포트 meta.rules_version과 비교해 재스캔 대상 판단"""
+    blob = json.dumps(RISK_RULES, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()[:16]
+
 # -----------------------------
 # 룰 적용 함수
 # -----------------------------
+# '.'이 개행도 넘도록 DOTALL: Document.text의 줄 구분 '\n'을 공백 1칸과 동일하게 취급
+_FLAGS = re.I | re.S
+_WS = re.compile(r"\s+")
+
+
+_stats_lock = threading.Lock()
+_STATS: Dict[str, Dict[str, float]] = {}  # pattern → {"slow", "timeouts", "max_ms"}
+
+
+def _engine() -> str:
+    return "regex" if RULES_ENGINE == "regex" and regex is not None else "re"
+
+
+@lru_cache(maxsize=None)
+def _compile(pat: str, engine: str = "re"):
+    """패턴 문자열 → 컴파일 결과(잘못된 패턴은 None). RISK_RULES가 바뀌어도 키가 패턴이라 안전."""
+    try:
+        if engine == "regex":
+            return regex.compile(pat, regex.I | regex.S)
+        return re.compile(pat, _FLAGS)
+    except (re.error, getattr(regex, "error", re.error)):
+        # 잘못된 정규식 패턴이 있어도 서비스 중단하지 않도록 안전 처리
+        return None
+
+
+def _record(pat: str, key: str, ms: float) -> None:
+    with _stats_lock:
+        st = _STATS.setdefault(pat, {"slow": 0, "timeouts": 0, "max_ms": 0.0})
+        st[key] += 1
+        st["max_ms"] = max(st["max_ms"], ms)
+
+
+def rule_stats() -> Dict[str, Dict[str, float]]:
+    """프로세스 시작 이후 느린 매치/타임아웃 집계 (pattern별)"""
+    with _stats_lock:
+        return {p: dict(v) for p, v in _STATS.items()}
+
+
+def _search(rx, pat: str, text: str, start: int, end: int, timeout: Optional[float]) -> bool:
+    t = time.perf_counter()
+    try:
+        m = rx.search(text, start, end, timeout=timeout) if timeout else rx.search(text, start, end)
+    except TimeoutError:
+        ms = (time.perf_counter() - t) * 1000
+        _record(pat, "timeouts", ms)
+        logger.warning(f"룰 매칭 타임아웃({ms:.0f}ms, {end - start}자): {pat}")
+        return False
+    ms = (time.perf_counter() - t) * 1000
+    if ms > RULE_SLOW_MS:
+        _record(pat, "slow", ms)
+        logger.warning(f"느린 룰 매칭({ms:.1f}ms, {end - start}자): {pat}")
+    return m is not None
+
+
+def _match_span(text: str, start: int, end: int, clause_id: int, hits: List[Dict]) -> None:
+    """text[start:end] 구간에 대해 전체 룰을 매칭 (pos/endpos 사용, 부분 문자열 복사 없음)"""
+    engine = _engine()
+    timeout = RULE_TIMEOUT_MS / 1000 if engine == "regex" and RULE_TIMEOUT_MS > 0 else None
+    for rtype, patterns in RISK_RULES.items():
+        for pat in patterns:
+            rx = _compile(pat, engine)
+            if rx is not None and _search(rx, pat, text, start, end, timeout):
+                hits.append({"type": rtype, "clause_id": clause_id, "pattern": pat})
+
+
+def profile_rules(texts: List[str], engine: Optional[str] = None,
+                  timeout_ms: Optional[float] = None) -> List[Dict]:
+    """
+    패턴별 매칭 비용 측정 (조항 코퍼스 전체). 느린 순으로 정렬해 반환.
+    [{"type","pattern","calls","hits","timeouts","total_ms","max_ms"}, ...]
+    """
+    engine = engine or _engine()
+    timeout = (timeout_ms / 1000) if (engine == "regex" and timeout_ms) else None
+    norm = [_WS.sub(" ", t) for t in texts if t]
+    rows = []
+    for rtype, patterns in RISK_RULES.items():
+        for pat in patterns:
+            rx = _compile(pat, engine)
+            row = {"type": rtype, "pattern": pat, "calls": 0, "hits": 0, "timeouts": 0,
+                   "total_ms": 0.0, "max_ms": 0.0}
+            if rx is None:
+                row["error"] = "invalid pattern"
+                rows.append(row)
+                continue
+            for t in norm:
+                t0 = time.perf_counter()
+                try:
+                    m = rx.search(t, timeout=timeout) if timeout else rx.search(t)
+                    row["hits"] += m is not None
+                except TimeoutError:
+                    row["timeouts"] += 1
+                ms = (time.perf_counter() - t0) * 1000
+                row["calls"] += 1
+                row["total_ms"] += ms
+                row["max_ms"] = max(row["max_ms"], ms)
+            rows.append(row)
+    rows.sort(key=lambda r: r["total_ms"], reverse=True)
+    return rows
+
+
 def apply_rules(clauses_text: List[str]):
     """
     각 조항 텍스트에 대해 카테고리별 패턴을 매칭하여 히트 리스트 반환.
@@ -151,18 +275,34 @@ def apply_rules(clauses_text: List[str]):
       ...
     ]
     """
-    hits = []
+    hits: List[Dict] = []
     for i, txt in enumerate(clauses_text):
         if not txt:
             continue
         # 공백 정리 후 매칭(대소문자 무시)
-        norm = re.sub(r"\s+", " ", txt)
-        for rtype, patterns in RISK_RULES.items():
-            for pat in patterns:
-                try:
-                    if re.search(pat, norm, flags=re.I):
-                        hits.append({"type": rtype, "clause_id": i, "pattern": pat})
-                except re.error:
-                    # 잘못된 정규식 패턴이 있어도 서비스 중단하지 않도록 안전 처리
-                    continue
+        norm = _WS.sub(" ", txt)
+        _match_span(norm, 0, len(norm), i, hits)
+    return hits
+
+
+def apply_rules_doc(doc, only: Optional[Set[int]] = None) -> List[Dict]:
+    """
+    Document의 조항 스팬 위에서 바로 매칭. Document.text는 이미 공백이 정리되어 있어
+    (줄 내부 공백 1칸, 줄 구분 '\n' 1개) 재정규화 없이 apply_rules와 같은 결과를 낸다.
+    only가 주어지면 해당 조항 id만 매칭 (개정본 비교 시 변경 조항, 문서 내 중복 조항은 대표만).
+    """
+    hits: List[Dict] = []
+    text = doc.text
+    for i, (s, e) in enumerate(doc.spans()):
+        if s < e and (only is None or i in only):
+            _match_span(text, s, e, i, hits)
     return hits
+
+
+def rule_order() -> Dict[tuple, int]:
+    """(type, pattern) → RISK_RULES 내 순서. 재사용 히트와 새 히트를 apply_rules 순서로 합칠 때 사용"""
+    order: Dict[tuple, int] = {}
+    for rtype, patterns in RISK_RULES.items():
+        for pat in patterns:
+            order.setdefault((rtype, pat), len(order))
+    return order
@@ -1,5 +1,5 @@
 # app/schemas.py
-from typing import List, Optional, Literal
+from typing import Dict, List, Optional, Literal
 from pydantic import BaseModel
 from uuid import UUID
 
@@ -25,6 +25,22 @@ class RiskItem(BaseModel):
 class Meta(BaseModel):
     pages: int
     file_path: str
+    rules_version: Optional[str] = None  # rules.rules_fingerprint() (룰 변경 시 재스캔 판단용)
+    created_at: Optional[str] = None    # 최초 저장 시각 (ISO-8601 UTC, storage.save_report)
+    timings: Optional[Dict[str, float]] = None  # 단계별 소요 시간(초): extract/split/rules/llm/...
+
+class ClauseChange(BaseModel):
+    status: Literal["unchanged", "modified", "added", "removed"]
+    clause_id: Optional[int] = None        # 새 버전 조항 id (removed면 None)
+    base_clause_id: Optional[int] = None   # 기준 버전 조항 id (added면 None)
+    similarity: Optional[float] = None
+    risks_added: List[str] = []            # 이 조항에서 새로 생긴 리스크 type
+    risks_removed: List[str] = []          # 이 조항에서 사라진 리스크 type
+
+class ReportDiff(BaseModel):
+    base_doc_id: str
+    counts: Dict[str, int]                 # status별 조항 수
+    changes: List[ClauseChange]
 
 class Report(BaseModel):
     # 업로드 단계에서는 문자열 UUID가 들어오므로 str | UUID 모두 허용
@@ -33,6 +49,7 @@ class Report(BaseModel):
     risks: List[RiskItem]
     clauses: List[Clause]
     meta: Meta
+    diff: Optional[ReportDiff] = None  # /upload?base_doc_id=... 로 개정본 비교 시
 
 UploadResponse = Report  # 업로드 응답은 Report 스키마와 동일
-__all__ = ["Report", "Clause", "Summary", "RiskItem", "Meta", "UploadResponse"]
\ No newline at end of file
+__all__ = ["Report", "Clause", "Summary", "RiskItem", "Meta", "ClauseChange", "ReportDiff", "UploadResponse"]
\ No newline at end of file
@@ -1,5 +1,8 @@
+import os
 import re
-from typing import List
+from typing import List, Optional, Tuple
+
+from .document import Document
 
 # 한국어 계약서 헤더 패턴 (비캡처 그룹으로 구성)
 PAT_HEADER = re.compile(
@@ -11,39 +14,130 @@ PAT_HEADER = re.compile(
     re.M | re.X
 )
 
-def _clean_quotes_commas(s: str) -> str:
-    # 라인 앞뒤의 따옴표/쉼표 제거
-    s = s.strip()
-    s = s.strip('",“”‘’')
-    return s
+# 헤더가 없을 때: '숫자.' 로 시작하는 줄 앞의 개행 (줄 시작이 아니어도 허용)
+PAT_NUM_LINE = re.compile(r"\n(?=\s*\"?\s*\d+\.)")  # 예:  \n 1.  / \n "1.
 
+MIN_CLAUSE_LEN = 20
 
-def split_into_clauses(pages: List[str]) -> List[str]:
-    text = "\n".join(pages or [])
-    if not text.strip():
-        return []
-
-    # 1) 정식 헤더로 먼저 시도
-    matches = list(PAT_HEADER.finditer(text))
-    chunks: List[str] = []
-
-    if matches:
-        starts = [m.start() for m in matches] + [len(text)]
-        for i in range(len(starts) - 1):
-            chunk = text[starts[i]:starts[i+1]].strip()
-            chunk = "\n".join(_clean_quotes_commas(l) for l in chunk.splitlines())
-            if len(chunk) > 20:
-                chunks.append(chunk)
-        return chunks
-
-    # 2) 실패 시: '숫자.' 패턴 기준으로 줄단위 분할 (줄 시작이 아니어도 허용)
-    rough = re.split(r"\n(?=\s*\"?\s*\d+\.)", text)  # 예:  \n 1.  / \n "1.
-    for r in rough:
-        r = r.strip()
-        if not r:
+# 조항 최대 길이(문자). 넘는 조항은 항/호 → 문장 → 줄 → 공백 경계 순으로 잘라 룰/LLM 비용 상한 보장 (0이면 제한 없음)
+MAX_CLAUSE_LEN = int(os.getenv("MAX_CLAUSE_LEN", "800"))
+
+# 긴 조항 내부의 항/호 시작 위치: ①~⑳(공백 뒤), 줄 첫머리의 '제N항', '1)', '(1)', '가.'
+PAT_ITEM = re.compile(
+    r"(?<!\S)[\u2460-\u2473]|(?<=\n)(?:제\s*\d+\s*[항호]|\(?\d+\)|[가나다라마바사아자차카타파하]\.(?=\s))"
+)
+# 문장 끝: 한글/닫는 괄호 뒤 마침표류 + 공백 ('가.' 같은 1글자 호 번호는 제외)
+PAT_SENT_END = re.compile(r"(?<=[가-힣)\]\"'”’])(?<!\s[가-힣])[.?!](?=\s)")
+
+
+def _trim(text: str, start: int, end: int):
+    """text[start:end].strip() 과 같은 경계를 복사 없이 계산."""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def _merge_tiny(text: str, bounds: List[int]) -> List[Tuple[int, int]]:
+    """
+    경계 → 조항 스팬. MIN_CLAUSE_LEN 이하 조각(예: 값 없는 '2. 근무장소 :')은 버리지 않고
+    다음 조항 앞에 붙인다 (마지막이면 직전 조항 뒤에).
+    """
+    spans: List[Tuple[int, int]] = []
+    pending = None  # 다음 조항에 붙일 작은 조각의 시작
+    for i in range(len(bounds) - 1):
+        s, e = _trim(text, bounds[i], bounds[i + 1])
+        if e <= s:
             continue
-        lines = [ _clean_quotes_commas(x) for x in r.splitlines() ]
-        cleaned = " ".join(l for l in lines if l)
-        if len(cleaned) > 20:
-            chunks.append(cleaned)
-    return chunks
+        if pending is not None:
+            s, pending = pending, None
+        if e - s > MIN_CLAUSE_LEN:
+            spans.append((s, e))
+        else:
+            pending = s
+    if pending is not None:
+        if spans:
+            spans[-1] = (spans[-1][0], _trim(text, pending, len(text))[1])
+        # 문서 전체가 MIN_CLAUSE_LEN 이하면 조항 없음 (기존 동작 유지)
+    return spans
+
+
+def _candidates(pat, text: str, start: int, end: int, at_end: bool) -> List[int]:
+    return [m.end() if at_end else m.start() for m in pat.finditer(text, start, end)]
+
+
+def _bounded(text: str, start: int, end: int, max_len: int) -> List[Tuple[int, int]]:
+    """
+    [start, end)를 max_len 이하 조각으로 분할. 각 조각은 max_len/2 이상이 되도록
+    [s + max_len/2, s + max_len] 구간에서 우선순위가 가장 높은 마지막 경계를 고른다.
+    경계 후보 목록은 한 번만 만들고 포인터만 전진 → 전체 선형 시간.
+    """
+    if end - start <= max_len:
+        return [(start, end)]
+    min_piece = max(MIN_CLAUSE_LEN + 1, max_len // 2)
+    levels = [_candidates(PAT_ITEM, text, start, end, False),      # 항/호 시작 앞
+              _candidates(PAT_SENT_END, text, start, end, True)]   # 문장 끝 뒤
+    ptrs = [0] * len(levels)
+    out: List[Tuple[int, int]] = []
+    s = start
+    while end - s > max_len:
+        lo = s + min_piece
+        hi = min(s + max_len, end - min_piece)  # 마지막 조각도 min_piece 이상 남김
+        cut = None
+        for li, cands in enumerate(levels):
+            j = ptrs[li]
+            while j < len(cands) and cands[j] <= hi:
+                j += 1
+            ptrs[li] = j
+            if j and cands[j - 1] >= lo:
+                cut = cands[j - 1]
+                break
+        if cut is None:
+            # 줄바꿈 → 공백 → 강제 절단 (rfind 범위는 조각 길이 이하)
+            for sep in ("\n", " "):
+                k = text.rfind(sep, lo, hi)
+                if k != -1:
+                    cut = k + 1
+                    break
+            else:
+                cut = hi
+        ps, pe = _trim(text, s, cut)
+        if pe > ps:
+            out.append((ps, pe))
+        s, _ = _trim(text, cut, end)
+    out.append((s, end))
+    return out
+
+
+def split_spans(doc: Document, max_len: Optional[int] = None) -> Document:
+    """
+    Document.text 위에서 조항 스팬을 한 번의 선형 스캔으로 계산해 doc에 기록.
+    줄 단위 따옴표/공백 정리는 Document.from_pages에서 이미 끝났으므로 부분 문자열을 만들지 않는다.
+    max_len(기본 MAX_CLAUSE_LEN)보다 긴 조항은 _bounded로 다시 나눈다.
+    """
+    text = doc.text
+    if not text:
+        return doc
+    max_len = MAX_CLAUSE_LEN if max_len is None else max_len
+    if max_len > 0:
+        max_len = max(max_len, 2 * (MIN_CLAUSE_LEN + 1))  # 조각 하한(max_len/2)이 MIN_CLAUSE_LEN을 넘도록
+
+    # 1) 정식 헤더로 먼저 시도. 첫 헤더 이전 텍스트(전문: 당사자/계약 개요)도 하나의 조항으로 유지
+    #    (MIN_CLAUSE_LEN 이하 제목만 있으면 _merge_tiny가 첫 조항 앞에 붙임)
+    bounds = [0] + [m.start() for m in PAT_HEADER.finditer(text)]
+    if len(bounds) == 1:
+        # 2) 실패 시: '숫자.' 줄 기준 분할
+        bounds += [m.end() for m in PAT_NUM_LINE.finditer(text)]
+    bounds.append(len(text))
+
+    for s, e in _merge_tiny(text, bounds):
+        pieces = _bounded(text, s, e, max_len) if max_len > 0 else [(s, e)]
+        for ps, pe in pieces:
+            doc.add_clause(ps, pe)
+    return doc
+
+
+def split_into_clauses(pages: List[str]) -> List[str]:
+    doc = split_spans(Document.from_pages(pages))
+    return doc.clause_texts()
@@ -1,8 +1,11 @@
 # 로컬 저장소
 
-import os, json, uuid
+import os, json, uuid, glob
+from datetime import datetime, timezone
 from typing import Dict
 
+from . import risk_stats
+
 STORAGE_DIR = os.getenv("STORAGE_DIR", "./data")
 UPLOAD_DIR = os.path.join(STORAGE_DIR, "uploads")
 REPORT_DIR = os.path.join(STORAGE_DIR, "reports")
@@ -18,12 +21,37 @@ def save_upload(file_bytes: bytes, filename: str) -> str:
     return doc_id, path
 
 def save_report(doc_id: str, report: Dict) -> str:
+    # 최초 저장 시각 (증분 내보내기 워터마크 기준, 재저장/재스캔 시 유지)
+    meta = report.setdefault("meta", {})
+    if not meta.get("created_at"):
+        meta["created_at"] = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
     path = os.path.join(REPORT_DIR, f"{doc_id}.json")
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(report, f, ensure_ascii=False, indent=2)
+    # 이전 파일 읽기 → 쓰기 → 리스크 집계 반영(덮어쓰기면 이전 기여분 차감)을 카운터 잠금 안에서
+    with risk_stats.transaction() as deltas:
+        previous = _read_json(path) if os.path.exists(path) else None
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        deltas.extend(risk_stats.saved_deltas(report, previous))
     return path
 
+def _read_json(path: str):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
 def load_report(doc_id: str) -> Dict:
     path = os.path.join(REPORT_DIR, f"{doc_id}.json")
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
+
+def delete_report(doc_id: str) -> Dict:
+    """리포트 파일 + 업로드 원본 삭제 후 삭제된 리포트 반환 (없으면 FileNotFoundError)"""
+    with risk_stats.transaction() as deltas:
+        report = load_report(doc_id)
+        os.remove(os.path.join(REPORT_DIR, f"{doc_id}.json"))
+        deltas.append(risk_stats.report_delta(report, -1))
+    for p in glob.glob(os.path.join(UPLOAD_DIR, f"{glob.escape(doc_id)}_*")):
+        os.remove(p)
+    return report
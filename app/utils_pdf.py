@@ -4,13 +4,16 @@ pypdf + OCR 통합 버전
 - 1차: pypdf로 페이지별 텍스트 추출
 - 2차: 텍스트가 거의 없는 페이지에 한해 pdf2image로 렌더링 후 pytesseract OCR
 - 출력: 정규화된 페이지별 텍스트 리스트
+- 대용량 문서: iter_pdf_pages()로 페이지 단위 스트리밍(렌더링 이미지는 임시 파일 → 즉시 삭제)
 """
 
+import gc
 import os
 import re
 import logging
+import tempfile
 import unicodedata
-from typing import List, Optional
+from typing import Iterator, List, Optional
 
 from pypdf import PdfReader
 from pdf2image import convert_from_path
@@ -32,6 +35,11 @@ OCR_LANG = os.getenv("OCR_LANG", "kor+eng")
 # pypdf 텍스트 길이 기준 미만이면 OCR 시도
 OCR_TRIGGER_LEN = int(os.getenv("OCR_TRIGGER_LEN", "25"))
 
+# 대용량 문서 모드: OCR 렌더링 DPI 상한, 윈도(페이지 묶음) 크기, 프로세스 RSS 예산(MB)
+OCR_DPI = int(os.getenv("OCR_DPI", "300"))
+LARGE_DOC_WINDOW = int(os.getenv("LARGE_DOC_WINDOW", "32"))
+LARGE_DOC_RSS_MB = int(os.getenv("LARGE_DOC_RSS_MB", "512"))
+
 logger = logging.getLogger(__name__)
 
 
@@ -56,7 +64,8 @@ def _normalize_ko(txt: str) -> str:
 def _ocr_pdf_pages(path: str, page_indices: List[int]) -> List[Optional[str]]:
     """
     지정한 page_indices에 대해 PDF 페이지를 이미지로 렌더링한 뒤 OCR 수행.
-    반환: 각 page index에 대응하는 텍스트(또는 None)의 리스트(입력 순서 보장).
+    반환: 각 page index에 대응하는 원문 텍스트(또는 None)의 리스트(입력 순서 보장).
+    정규화는 pdf_to_pages 마지막 단계에서 한 번만 수행한다.
     """
     # convert_from_path는 page 번호를 1부터 받으므로 +1 보정
     if not page_indices:
@@ -78,31 +87,46 @@ def _ocr_pdf_pages(path: str, page_indices: List[int]) -> List[Optional[str]]:
         page_num = first + offset  # 1-based
         page_idx0 = page_num - 1   # 0-based
         if page_idx0 in page_indices:
-            text = pytesseract.image_to_string(img, lang=OCR_LANG) or ""
-            result_map[page_idx0] = _normalize_ko(text)
+            result_map[page_idx0] = pytesseract.image_to_string(img, lang=OCR_LANG) or ""
 
     # 입력 순서대로 반환
     return [result_map.get(i) for i in page_indices]
 
 
+# ----------------------------
+# 유틸: PdfReader 열기(암호 처리)
+# ----------------------------
+def _open_reader(path: str) -> Optional[PdfReader]:
+    reader = PdfReader(path)
+    if reader.is_encrypted:
+        try:
+            reader.decrypt("")  # 빈 비밀번호 시도
+        except Exception as e:
+            # 암호 해제 실패 시 None (상위에서 빈 결과로 처리)
+            logger.warning(f"암호화 PDF 해제 실패: {e}")
+            return None
+    return reader
+
+
+def count_pages(path: str) -> int:
+    reader = _open_reader(path)
+    return len(reader.pages) if reader is not None else 0
+
+
 # ----------------------------
 # 메인: PDF → 페이지 텍스트
 # ----------------------------
-def pdf_to_pages(path: str, max_pages: int = 100) -> List[str]:
+def pdf_to_pages(path: str, max_pages: int = 100, keep_empty: bool = False) -> List[str]:
     """
     1) pypdf로 텍스트 추출
     2) 텍스트가 거의 없는 페이지는 OCR로 재구성
     3) 정규화된 페이지 텍스트 리스트 반환
+       keep_empty=True면 빈 페이지도 ""로 유지 → 리스트 인덱스 == PDF 페이지 인덱스(0-based)
     """
     # 0) 암호/권한 처리 (빈 패스워드 열기 시도)
-    reader = PdfReader(path)
-    if reader.is_encrypted:
-        try:
-            reader.decrypt("")  # 빈 비밀번호 시도
-        except Exception as e:
-            # 암호 해제 실패 시 빈 리스트 반환(상위에서 에러로 처리해도 됨)
-            logger.warning(f"암호화 PDF 해제 실패: {e}")
-            return []
+    reader = _open_reader(path)
+    if reader is None:
+        return []
 
     # 1) pypdf 1차 추출
     pages_raw: List[Optional[str]] = []
@@ -132,8 +156,103 @@ def pdf_to_pages(path: str, max_pages: int = 100) -> List[str]:
     pages = []
     for txt in pages_raw:
         norm = _normalize_ko(txt or "")
-        # 빈 페이지라도 리포트에 페이지 수를 맞추고 싶다면 append("")로 유지 가능
-        if norm:
+        # 빈 페이지라도 리포트에 페이지 수를 맞추고 싶다면 keep_empty=True
+        if norm or keep_empty:
             pages.append(norm)
 
     return pages
+
+
+# ----------------------------
+# 대용량 문서 모드: 페이지 단위 스트리밍
+# ----------------------------
+def current_rss_mb() -> Optional[float]:
+    """현재 프로세스 RSS(MB). 측정 불가 환경이면 None"""
+    try:
+        import psutil  # 옵션
+        return psutil.Process().memory_info().rss / 2**20
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _page_dpi(page, image_budget_bytes: int) -> int:
+    """
+    그레이스케일(1 byte/px) 렌더링 이미지가 예산을 넘지 않는 DPI.
+    A4 @300dpi ≈ 8.7MB 이므로 보통은 OCR_DPI 그대로, 예산이 작거나 페이지가 크면 낮춘다.
+    """
+    try:
+        w_in = float(page.mediabox.width) / 72.0
+        h_in = float(page.mediabox.height) / 72.0
+    except Exception:
+        w_in, h_in = 8.27, 11.69  # A4
+    fit = int((image_budget_bytes / max(w_in * h_in, 1e-6)) ** 0.5)
+    return max(72, min(OCR_DPI, fit))
+
+
+def _ocr_single_page(path: str, idx: int, dpi: int, tmpdir: str) -> str:
+    """한 페이지만 임시 파일로 렌더링 → OCR → 파일/이미지 즉시 해제"""
+    paths = convert_from_path(
+        path,
+        dpi=dpi,
+        first_page=idx + 1,
+        last_page=idx + 1,
+        output_folder=tmpdir,
+        paths_only=True,     # 이미지를 메모리에 들고 있지 않음
+        grayscale=True,
+        fmt="png",
+        poppler_path=POPPLER_PATH,
+    )
+    texts = []
+    for p in paths:
+        try:
+            with Image.open(p) as img:
+                texts.append(pytesseract.image_to_string(img, lang=OCR_LANG) or "")
+        finally:
+            os.remove(p)
+    return "\n".join(texts)
+
+
+def iter_pdf_pages(path: str,
+                   max_pages: Optional[int] = None,
+                   window: int = LARGE_DOC_WINDOW,
+                   rss_budget_mb: int = LARGE_DOC_RSS_MB) -> Iterator[str]:
+    """
+    대용량 PDF용: 정규화된 페이지 텍스트를 한 장씩 yield (빈 페이지는 "", 인덱스 == 페이지 번호).
+    - OCR 대상 페이지는 1장씩 임시 파일로 렌더링하고 바로 삭제
+    - window 페이지마다 PdfReader를 다시 열어 pypdf 페이지 캐시를 버리고 gc
+    - 렌더링 이미지 크기를 RSS 예산의 1/4 이내로 제한(DPI 자동 조정)
+    """
+    total = count_pages(path)
+    n = min(total, max_pages) if max_pages else total
+    image_budget = rss_budget_mb * 2**20 // 4
+
+    with tempfile.TemporaryDirectory(prefix="contract_ocr_") as tmpdir:
+        for w0 in range(0, n, max(1, window)):
+            reader = _open_reader(path)
+            if reader is None:
+                return
+            for i in range(w0, min(w0 + window, n)):
+                page = reader.pages[i]
+                try:
+                    txt = page.extract_text() or ""
+                except Exception as e:
+                    logger.warning(f"pypdf 추출 실패(page {i+1}): {e}")
+                    txt = ""
+                if len(txt) < OCR_TRIGGER_LEN:
+                    try:
+                        ocr = _ocr_single_page(path, i, _page_dpi(page, image_budget), tmpdir)
+                        if ocr.strip():
+                            txt = ocr
+                    except Exception as e:
+                        logger.warning(f"OCR 수행 실패(page {i+1}): {e}")
+                yield _normalize_ko(txt)
+            del reader, page
+            gc.collect()
+            rss = current_rss_mb()
+            if rss is not None and rss > rss_budget_mb:
+                logger.warning(f"RSS {rss:.0f}MB가 예산 {rss_budget_mb}MB 초과 (page {w0+1}~{min(w0 + window, n)})")
@@ -1,5 +1,9 @@
 # app/vector_search.py
+import json
+import os
+
 import numpy as np
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from sklearn.neighbors import NearestNeighbors
 
 class SimpleVectorIndex:
@@ -17,3 +21,349 @@ class SimpleVectorIndex:
     def query(self, qvec: list[float], k: int = 5):
         dists, idxs = self.nn.kneighbors([qvec], n_neighbors=k, return_distance=True)
         return idxs[0].tolist(), dists[0].tolist()
+
+    def query_many(self, Q, k: int = 5):
+        """(n, d) 질의 행렬을 한 번에 검색. 반환: (ids (n,k), dists (n,k))"""
+        dists, idxs = self.nn.kneighbors(np.asarray(Q, dtype=np.float32), n_neighbors=k, return_distance=True)
+        return idxs, dists
+
+
+# ============================================================
+# 근사 최근접(ANN) 인덱스: 백엔드/저장 형식 선택
+# - backend: "flat"(정확) | "ivf"(k-means 역색인) | "hnsw"(faiss 필요, 옵션)
+# - storage: "f32" | "f16" | "pq"(product quantization, uint8 코드)
+# 벡터는 L2 정규화 후 내적(=cosine 유사도)으로 점수화. 반환값은 유사도(클수록 가까움).
+# ============================================================
+BACKENDS = ("flat", "ivf", "hnsw")
+STORAGES = ("f32", "f16", "pq")
+
+
+def _normalize(X) -> np.ndarray:
+    X = np.array(X, dtype=np.float32, ndmin=2)
+    X /= np.maximum(np.linalg.norm(X, axis=1, keepdims=True), 1e-12)
+    return X
+
+
+def _topk(scores: np.ndarray, k: int):
+    """행별 top-k (유사도 내림차순). scores: (n, m)"""
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64), np.empty((scores.shape[0], 0), dtype=np.float32)
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    part_s = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_s, axis=1)
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_s, order, axis=1)
+
+
+def _kmeans(X: np.ndarray, k: int, seed: int = 0) -> np.ndarray:
+    k = max(1, min(k, X.shape[0]))
+    if X.shape[0] > 20000:
+        km = MiniBatchKMeans(n_clusters=k, random_state=seed, n_init=3, batch_size=4096)
+    else:
+        km = KMeans(n_clusters=k, random_state=seed, n_init=1, max_iter=50)
+    return km.fit(X).cluster_centers_.astype(np.float32)
+
+
+class _Codec:
+    """벡터 저장 형식. encode()로 압축, scores(Q, codes)로 질의 × 코드 내적 계산."""
+
+    def __init__(self, storage: str, pq_m: int = 16, pq_bits: int = 8, train_size: int = 50000):
+        if storage not in STORAGES:
+            raise ValueError(f"storage는 {STORAGES} 중 하나여야 합니다: {storage}")
+        self.storage = storage
+        self.pq_m = pq_m
+        self.pq_ksub = 2 ** pq_bits
+        self.train_size = train_size
+        self.codebooks = None  # pq: (m, ksub, dsub)
+
+    def train(self, X: np.ndarray) -> None:
+        if self.storage != "pq":
+            return
+        d = X.shape[1]
+        if d % self.pq_m:
+            raise ValueError(f"차원 {d}이 pq_m={self.pq_m}로 나누어 떨어지지 않습니다.")
+        dsub = d // self.pq_m
+        sample = X[np.random.default_rng(0).permutation(X.shape[0])[:self.train_size]]
+        books = []
+        for j in range(self.pq_m):
+            cb = _kmeans(sample[:, j * dsub:(j + 1) * dsub], self.pq_ksub, seed=j)
+            if cb.shape[0] < self.pq_ksub:  # 학습 표본이 적으면 빈 코드워드를 0으로 채움
+                cb = np.vstack([cb, np.zeros((self.pq_ksub - cb.shape[0], dsub), np.float32)])
+            books.append(cb)
+        self.codebooks = np.stack(books)
+
+    def encode(self, X: np.ndarray) -> np.ndarray:
+        if self.storage == "f32":
+            return X.astype(np.float32)
+        if self.storage == "f16":
+            return X.astype(np.float16)
+        m, _, dsub = self.codebooks.shape
+        codes = np.empty((X.shape[0], m), dtype=np.uint8 if self.pq_ksub <= 256 else np.uint16)
+        for j in range(m):
+            sub = X[:, j * dsub:(j + 1) * dsub]
+            cb = self.codebooks[j]
+            # argmin ||x - c||^2 = argmax (x·c - ||c||^2/2)
+            codes[:, j] = np.argmax(sub @ cb.T - 0.5 * (cb * cb).sum(1), axis=1)
+        return codes
+
+    def scores(self, Q: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """(nq, d) 질의 × 저장 코드 → (nq, n) 내적 점수"""
+        if self.storage != "pq":
+            return Q @ codes.T.astype(np.float32, copy=False)
+        m, _, dsub = self.codebooks.shape
+        # ADC: 서브공간별 질의-코드워드 내적 테이블을 만들고 코드로 합산
+        tables = np.einsum("qmd,mkd->qmk", Q.reshape(Q.shape[0], m, dsub), self.codebooks)
+        out = np.zeros((Q.shape[0], codes.shape[0]), dtype=np.float32)
+        for j in range(m):
+            out += tables[:, j, codes[:, j]]
+        return out
+
+
+class ANNIndex:
+    """
+    대용량 조항 벡터용 근사 검색 인덱스.
+    예) ANNIndex(backend="ivf", storage="pq", nlist=1024, nprobe=16, pq_m=16, rerank=4)
+    - build(X): 학습 + 추가 / train(sample) 후 add(X)를 나눠 호출해도 됨 (add는 새 벡터만 리스트 끝에 append)
+    - query_many(Q, k, vectors=X): (n, d) 질의를 배치로 검색 → (ids (n,k), sims (n,k)), 빈 슬롯은 id=-1
+      rerank>0 이고 원본 벡터(vectors, memmap 가능)를 넘기면 k*rerank개 후보를 원본 내적으로 재정렬
+    - save(path) / ANNIndex.load(path): 코드북·센트로이드·코드를 파일 1개(npz)로 저장/복원
+    """
+
+    def __init__(self, backend: str = "ivf", storage: str = "f32", nlist: int = 256, nprobe: int = 8,
+                 pq_m: int = 16, pq_bits: int = 8, hnsw_m: int = 32, ef_search: int = 64, rerank: int = 0):
+        if backend not in BACKENDS:
+            raise ValueError(f"backend는 {BACKENDS} 중 하나여야 합니다: {backend}")
+        self.backend = backend
+        self.storage = storage
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.pq_bits = pq_bits
+        self.hnsw_m = hnsw_m
+        self.ef_search = ef_search
+        self.rerank = rerank
+        self.codec = _Codec(storage, pq_m=pq_m, pq_bits=pq_bits)
+        self.dim = None
+        self.ntotal = 0
+        # flat/ivf 공통: 리스트(클러스터)별 코드/원래 id 배열. 용량을 두 배씩 늘려 가며 앞쪽 sizes[l]개만 사용
+        self.centroids = None
+        self._codes = []
+        self._ids = []
+        self._sizes = None
+        self._faiss = None
+
+    # ---------- 구축 ----------
+    def build(self, embeddings):
+        X = _normalize(embeddings)
+        self.train(X)
+        self.add(X)
+        return self
+
+    def train(self, sample) -> "ANNIndex":
+        """코드북/센트로이드 학습 (표본만 있으면 됨). 기존에 추가된 벡터는 비운다."""
+        X = _normalize(sample)
+        self.dim = X.shape[1]
+        self.ntotal = 0
+        if self.backend == "hnsw":
+            self._faiss = self._make_hnsw(X)
+            return self
+        if self.backend == "ivf":
+            sample = X[np.random.default_rng(0).permutation(X.shape[0])[:max(self.nlist * 64, 10000)]]
+            self.centroids = _kmeans(sample, self.nlist)
+        else:
+            self.centroids = np.zeros((1, self.dim), dtype=np.float32)
+        # 코드는 센트로이드와의 잔차(x - c)를 저장: q·x = q·c + q·(x - c) → PQ 양자화 오차가 훨씬 작음
+        self.codec.train(X - self.centroids[np.argmax(X @ self.centroids.T, axis=1)])
+        self._reset_lists()
+        return self
+
+    def _reset_lists(self) -> None:
+        empty = self.codec.encode(np.zeros((0, self.dim), dtype=np.float32))
+        nl = self.centroids.shape[0]
+        self._codes = [empty] * nl
+        self._ids = [np.empty(0, dtype=np.int64)] * nl
+        self._sizes = np.zeros(nl, dtype=np.int64)
+
+    def _make_hnsw(self, X: np.ndarray):
+        try:
+            import faiss
+        except ImportError as e:
+            raise ImportError("hnsw 백엔드는 faiss-cpu 설치가 필요합니다. (pip install faiss-cpu)") from e
+        d = X.shape[1]
+        # 정규화 벡터에서 L2 순위 == 내적 순위 → 모든 저장 형식에서 L2 인덱스 사용
+        if self.storage == "f32":
+            index = faiss.IndexHNSWFlat(d, self.hnsw_m)
+        elif self.storage == "f16":
+            index = faiss.IndexHNSWSQ(d, faiss.ScalarQuantizer.QT_fp16, self.hnsw_m)
+        else:
+            index = faiss.IndexHNSWPQ(d, self.codec.pq_m, self.hnsw_m)
+        if not index.is_trained:
+            index.train(X)
+        index.hnsw.efSearch = self.ef_search
+        return index
+
+    def add(self, embeddings) -> None:
+        """새 벡터를 id ntotal, ntotal+1, ... 로 추가. 비용은 추가 건수에 비례 (기존 코드 재정렬 없음)"""
+        X = _normalize(embeddings)
+        n = X.shape[0]
+        if not n:
+            return
+        new_ids = np.arange(self.ntotal, self.ntotal + n, dtype=np.int64)
+        self.ntotal += n
+        if self._faiss is not None:
+            self._faiss.add(X)
+            return
+        assign = np.argmax(X @ self.centroids.T, axis=1)
+        codes = self.codec.encode(X - self.centroids[assign])
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=self.centroids.shape[0])
+        ends = np.cumsum(counts)
+        for lst in np.nonzero(counts)[0]:
+            sel = order[ends[lst] - counts[lst]:ends[lst]]
+            self._append(lst, codes[sel], new_ids[sel])
+
+    def _append(self, lst: int, codes: np.ndarray, ids: np.ndarray) -> None:
+        size = int(self._sizes[lst])
+        need = size + ids.shape[0]
+        if need > self._ids[lst].shape[0]:
+            cap = max(need, 2 * self._ids[lst].shape[0], 64)
+            grown = np.empty((cap,) + codes.shape[1:], dtype=codes.dtype)
+            grown[:size] = self._codes[lst][:size]
+            grown_ids = np.empty(cap, dtype=np.int64)
+            grown_ids[:size] = self._ids[lst][:size]
+            self._codes[lst], self._ids[lst] = grown, grown_ids
+        self._codes[lst][size:need] = codes
+        self._ids[lst][size:need] = ids
+        self._sizes[lst] = need
+
+    # ---------- 검색 ----------
+    def query(self, qvec, k: int = 5, vectors=None):
+        ids, sims = self.query_many([qvec], k, vectors=vectors)
+        return ids[0].tolist(), sims[0].tolist()
+
+    def query_many(self, Q, k: int = 5, chunk: int = 1024, vectors=None):
+        Q = _normalize(Q)
+        if self.rerank > 0 and vectors is not None:
+            ids, _ = self._search(Q, k * self.rerank, chunk)
+            return self._rerank(Q, ids, k, vectors)
+        return self._search(Q, k, chunk)
+
+    def _rerank(self, Q: np.ndarray, cand: np.ndarray, k: int, vectors):
+        """근사 후보를 원본 벡터 내적으로 다시 점수화해 상위 k개만 남김"""
+        out_ids = np.full((Q.shape[0], k), -1, dtype=np.int64)
+        out_sims = np.full((Q.shape[0], k), -np.inf, dtype=np.float32)
+        for qi in range(Q.shape[0]):
+            ids = np.sort(cand[qi][cand[qi] >= 0])  # 정렬된 id로 읽어야 memmap 접근이 순차적
+            if not ids.size:
+                continue
+            exact = np.asarray(vectors[ids], dtype=np.float32) @ Q[qi]
+            top, top_s = _topk(exact[None, :], k)
+            out_ids[qi, :top.shape[1]] = ids[top[0]]
+            out_sims[qi, :top.shape[1]] = top_s[0]
+        return out_ids, out_sims
+
+    def _search(self, Q: np.ndarray, k: int, chunk: int):
+        nq = Q.shape[0]
+        out_ids = np.full((nq, k), -1, dtype=np.int64)
+        out_sims = np.full((nq, k), -np.inf, dtype=np.float32)
+        if not self.ntotal:
+            return out_ids, out_sims
+
+        if self._faiss is not None:
+            D, I = self._faiss.search(Q, k)
+            sims = (1.0 - D / 2.0).astype(np.float32)
+            sims[I < 0] = -np.inf
+            return I.astype(np.int64), sims
+
+        if self.backend == "flat":
+            n = int(self._sizes[0])
+            codes, all_ids = self._codes[0][:n], self._ids[0][:n]
+            # (chunk, n) 점수 행렬이 ~256MB를 넘지 않도록 질의 묶음 크기 제한
+            chunk = max(1, min(chunk, (1 << 26) // self.ntotal))
+            for s in range(0, nq, chunk):
+                ids, sims = _topk(self.codec.scores(Q[s:s + chunk], codes), k)
+                out_ids[s:s + chunk, :ids.shape[1]] = all_ids[ids]
+                out_sims[s:s + chunk, :sims.shape[1]] = sims
+            return out_ids, out_sims
+
+        # IVF: 질의별 상위 nprobe 리스트 선택 → 리스트 단위로 질의를 묶어 행렬곱
+        nprobe = min(self.nprobe, self.centroids.shape[0])
+        probe = _topk(Q @ self.centroids.T, nprobe)[0]
+        cand_ids = [[] for _ in range(nq)]
+        cand_sims = [[] for _ in range(nq)]
+        for lst in np.unique(probe):
+            size = int(self._sizes[lst])
+            if not size:
+                continue
+            qs = np.nonzero((probe == lst).any(axis=1))[0]
+            scores = self.codec.scores(Q[qs], self._codes[lst][:size]) + (Q[qs] @ self.centroids[lst])[:, None]
+            ids, sims = _topk(scores, k)
+            for row, qi in enumerate(qs):
+                cand_ids[qi].append(self._ids[lst][ids[row]])
+                cand_sims[qi].append(sims[row])
+        for qi in range(nq):
+            if not cand_ids[qi]:
+                continue
+            ids = np.concatenate(cand_ids[qi])
+            sims = np.concatenate(cand_sims[qi])
+            top, top_s = _topk(sims[None, :], k)
+            out_ids[qi, :top.shape[1]] = ids[top[0]]
+            out_sims[qi, :top.shape[1]] = top_s[0]
+        return out_ids, out_sims
+
+    # ---------- 저장/복원 ----------
+    def _config(self) -> dict:
+        return {"backend": self.backend, "storage": self.storage, "nlist": self.nlist, "nprobe": self.nprobe,
+                "pq_m": self.codec.pq_m, "pq_bits": self.pq_bits, "hnsw_m": self.hnsw_m,
+                "ef_search": self.ef_search, "rerank": self.rerank}
+
+    def save(self, path: str) -> None:
+        """임시 파일에 쓴 뒤 교체 (읽는 프로세스는 이전/새 파일 중 하나만 본다)"""
+        meta = dict(self._config(), dim=self.dim, ntotal=self.ntotal)
+        arrays = {"config": np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8)}
+        if self._faiss is not None:
+            import faiss
+            arrays["faiss"] = faiss.serialize_index(self._faiss)
+        else:
+            arrays["centroids"] = self.centroids
+            arrays["sizes"] = self._sizes
+            arrays["codes"] = np.concatenate([c[:s] for c, s in zip(self._codes, self._sizes)])
+            arrays["ids"] = np.concatenate([i[:s] for i, s in zip(self._ids, self._sizes)])
+            if self.codec.codebooks is not None:
+                arrays["codebooks"] = self.codec.codebooks
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "ANNIndex":
+        with np.load(path) as z:
+            meta = json.loads(z["config"].tobytes().decode("utf-8"))
+            idx = cls(**{k: v for k, v in meta.items() if k not in ("dim", "ntotal")})
+            idx.dim, idx.ntotal = meta["dim"], meta["ntotal"]
+            if "faiss" in z:
+                import faiss
+                idx._faiss = faiss.deserialize_index(z["faiss"])
+                idx._faiss.hnsw.efSearch = idx.ef_search
+                return idx
+            if "codebooks" in z:
+                idx.codec.codebooks = z["codebooks"]
+            idx.centroids = z["centroids"]
+            idx._sizes = z["sizes"].astype(np.int64)
+            bounds = np.concatenate([[0], np.cumsum(idx._sizes)])
+            codes, ids = z["codes"], z["ids"]
+            idx._codes = [codes[a:b].copy() for a, b in zip(bounds[:-1], bounds[1:])]
+            idx._ids = [ids[a:b].copy() for a, b in zip(bounds[:-1], bounds[1:])]
+        return idx
+
+    # ---------- 메모리 ----------
+    @property
+    def bytes_per_vector(self) -> float:
+        """벡터 1개당 저장 바이트(코드 + id, 코드북/센트로이드 같은 고정 비용 제외)"""
+        if not self.ntotal:
+            return 0.0
+        if self._faiss is not None:
+            code = {"f32": 4 * self.dim, "f16": 2 * self.dim, "pq": self.codec.pq_m}[self.storage]
+            return float(code + 4 * self.hnsw_m * 2)  # 레벨0 링크(2M개 int32) 근사
+        row = self._codes[0].dtype.itemsize * int(np.prod(self._codes[0].shape[1:])) + 8
+        return float(row * int(self._sizes.sum())) / self.ntotal
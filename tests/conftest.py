@@ -0,0 +1,14 @@
+# tests/conftest.py
+# app 모듈은 import 시점에 환경변수를 읽으므로 먼저 테스트용 값으로 고정 (외부 DB/LLM 미사용)
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ["STORAGE_DIR"] = tempfile.mkdtemp(prefix="contract-ai-test-")
+os.environ["DATABASE_URL"] = ""
+os.environ["LLM_PROVIDER"] = "none"
+os.environ["CLAUSE_INDEX_ENABLED"] = "false"
+os.environ.setdefault("GOOGLE_API_KEY", "test")
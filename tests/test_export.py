@@ -0,0 +1,71 @@
+# tests/test_export.py
+import json
+import os
+
+import pytest
+
+pytest.importorskip("pyarrow")
+import pyarrow.dataset as ds  # noqa: E402
+
+from app.export import export_reports  # noqa: E402
+
+DAY = "2026-10-01"
+
+
+def _write(report_dir: str, doc_id: str, n_risks: int, one_line: str, mtime: float) -> None:
+    report = {
+        "doc_id": doc_id,
+        "meta": {"created_at": f"{DAY}T09:00:00+00:00", "pages": 1},
+        "summary": {"one_line": one_line, "bullets": []},
+        "clauses": [{"id": 0, "page": 0, "start": 0, "end": 20, "text": "임차인은 보증금을 지급한다."}],
+        "risks": [{"type": "deposit", "severity": "high", "llm_verdict": "risky",
+                   "rule_hits": ["보증금"], "evidence_ids": [0]}] * n_risks,
+    }
+    path = os.path.join(report_dir, f"{doc_id}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False)
+    os.utime(path, (mtime, mtime))
+
+
+def _read(export_dir: str, table: str):
+    return ds.dataset(os.path.join(export_dir, table), format="parquet", partitioning="hive").to_table().to_pylist()
+
+
+def test_modified_report_replaces_previous_rows(tmp_path):
+    report_dir, export_dir = str(tmp_path / "reports"), str(tmp_path / "export")
+    os.makedirs(report_dir)
+    t0 = 2_000_000_000.0
+    for i in range(4):
+        _write(report_dir, f"doc{i}", 2, f"요약 {i}", t0 - 60)
+    res = export_reports(report_dir, export_dir, now=t0)
+    assert res["docs"] == 4 and res["rows"]["risks"] == 8 and res["rewritten_parts"] == 0
+
+    # 변경 없으면 다음 실행은 아무것도 내보내지 않음
+    assert export_reports(report_dir, export_dir, now=t0 + 10)["docs"] == 0
+
+    # doc1 재저장: 리스크 2 → 0건, 요약 변경
+    _write(report_dir, "doc1", 0, "수정된 요약", t0 + 50)
+    res = export_reports(report_dir, export_dir, now=t0 + 100)
+    assert res["docs"] == 1
+    assert res["replaced"]["reports"] == 1 and res["replaced"]["risks"] == 2
+
+    reports = _read(export_dir, "reports")
+    assert sorted(r["doc_id"] for r in reports) == ["doc0", "doc1", "doc2", "doc3"]
+    assert {r["doc_id"]: r["one_line"] for r in reports}["doc1"] == "수정된 요약"
+    risks = _read(export_dir, "risks")
+    assert len(risks) == 6 and "doc1" not in {r["doc_id"] for r in risks}
+    assert len(_read(export_dir, "clauses")) == 4
+
+
+def test_rerun_without_watermark_does_not_duplicate(tmp_path):
+    report_dir, export_dir = str(tmp_path / "reports"), str(tmp_path / "export")
+    os.makedirs(report_dir)
+    t0 = 2_000_000_000.0
+    for i in range(3):
+        _write(report_dir, f"doc{i}", 1, f"요약 {i}", t0 - 60)
+    export_reports(report_dir, export_dir, now=t0)
+    # 워터마크 기록 전에 중단된 경우와 같음
+    os.remove(os.path.join(export_dir, "_watermark.json"))
+    export_reports(report_dir, export_dir, now=t0)
+    assert sorted(r["doc_id"] for r in _read(export_dir, "reports")) == ["doc0", "doc1", "doc2"]
+    assert len(_read(export_dir, "risks")) == 3
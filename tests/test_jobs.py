@@ -0,0 +1,60 @@
+# tests/test_jobs.py
+import threading
+
+import pytest
+
+from app.jobs import AdmissionRejected, JobRunner
+
+
+@pytest.fixture
+def blocked_runner():
+    """실행 1 + 대기 1이 모두 찬 JobRunner (테스트 종료 시 작업 해제)"""
+    runner = JobRunner(max_concurrent=1, max_queue=1, client_quota=0)
+    gate = threading.Event()
+    futures = []
+    for i in range(2):
+        runner.admit("a")
+        futures.append(runner.submit("a", f"job{i}", gate.wait))
+    yield runner
+    gate.set()
+    for f in futures:
+        f.result(timeout=5)
+
+
+def test_queue_full_rejects_with_retry_after(blocked_runner):
+    with pytest.raises(AdmissionRejected) as exc:
+        blocked_runner.admit("b")
+    assert exc.value.retry_after >= 1
+    assert blocked_runner.stats()["inflight"] == 2
+
+
+def test_batch_admission_is_all_or_nothing():
+    runner = JobRunner(max_concurrent=1, max_queue=2, client_quota=0)
+    with pytest.raises(AdmissionRejected):
+        runner.admit("a", 4)
+    assert runner.stats()["inflight"] == 0
+    runner.admit("a", 3)
+    runner.release("a", 3)
+    assert runner.stats()["inflight"] == 0
+
+
+def test_client_quota():
+    runner = JobRunner(max_concurrent=1, max_queue=10, client_quota=2)
+    runner.admit("a", 2)
+    with pytest.raises(AdmissionRejected):
+        runner.admit("a")
+    runner.admit("b")  # 다른 클라이언트는 영향 없음
+    runner.release("a")
+    runner.admit("a")
+
+
+def test_upload_returns_429_when_queue_is_full(blocked_runner, monkeypatch):
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+    from app import main
+
+    monkeypatch.setattr(main, "runner", blocked_runner)
+    resp = TestClient(main.app).post("/upload", files={"file": ("a.pdf", b"%PDF-1.4\n", "application/pdf")})
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) >= 1
+    assert resp.json()["retry_after"] == int(resp.headers["Retry-After"])
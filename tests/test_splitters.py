@@ -0,0 +1,63 @@
+# tests/test_splitters.py
+import re
+
+from app.document import Document
+from app.splitters import MIN_CLAUSE_LEN, _bounded, _merge_tiny, split_spans
+
+
+def _split(text: str, max_len: int = 0):
+    doc = split_spans(Document.from_pages([text]), max_len=max_len)
+    return doc.clause_texts()
+
+
+def _squash(s: str) -> str:
+    return re.sub(r"\s+", "", s)
+
+
+def test_preamble_before_first_header_is_kept():
+    text = ("본 계약은 임대인 홍길동과 임차인 김철수 사이에 아래와 같이 체결한다.\n"
+            "제1조 목적\n이 계약은 주택 임대차에 관한 사항을 정함을 목적으로 한다.\n"
+            "제2조 보증금\n임차인은 계약 체결 시 보증금 일억원을 임대인에게 지급한다.\n")
+    clauses = _split(text)
+    assert clauses[0].startswith("본 계약은 임대인")
+    assert len(clauses) == 3
+    assert clauses[1].startswith("제1조") and clauses[2].startswith("제2조")
+
+
+def test_tiny_fragment_is_merged_into_next_clause():
+    text = "2. 근무장소 :\n3. 근무시간은 오전 9시부터 오후 6시까지로 하며 휴게시간은 1시간으로 한다.\n"
+    spans = _merge_tiny(text, [0, text.index("3."), len(text)])
+    assert len(spans) == 1
+    s, e = spans[0]
+    assert text[s:e].startswith("2. 근무장소") and text[s:e].endswith("한다.")
+
+
+def test_bounded_caps_length_and_keeps_all_text():
+    sent = "임차인은 관리비를 매월 말일까지 임대인이 지정한 계좌로 납부하여야 한다. "
+    text = "제3조 관리비\n" + sent * 60
+    max_len = 200
+    pieces = _bounded(text, 0, len(text), max_len)
+    assert len(pieces) > 1
+    for s, e in pieces:
+        assert e - s <= max_len
+        assert e - s > MIN_CLAUSE_LEN
+    # 경계 공백만 빠지고 내용은 그대로
+    assert _squash("".join(text[s:e] for s, e in pieces)) == _squash(text)
+    # 문장 끝에서 자름
+    assert all(text[s:e].endswith("한다.") for s, e in pieces[:-1])
+
+
+def test_bounded_prefers_item_boundaries():
+    items = "".join(f"\n({i}) 임대인은 목적물을 임차인이 사용·수익하기에 필요한 상태로 유지하여야 하며 수선 의무를 진다."
+                    for i in range(1, 13))
+    text = "제4조 임대인의 의무" + items
+    pieces = _bounded(text, 0, len(text), 300)
+    assert all(text[s:e].startswith("(") for s, e in pieces[1:])
+
+
+def test_split_spans_applies_max_len():
+    text = "제1조 목적\n" + "가나다라마바사아자차 " * 200 + "\n제2조 기간\n계약 기간은 2년으로 하며 만료 1개월 전까지 통지한다.\n"
+    clauses = _split(text, max_len=300)
+    assert all(len(c) <= 300 for c in clauses)
+    assert clauses[-1].startswith("제2조")
+    assert _squash("".join(clauses)) == _squash(text)
@@ -0,0 +1,125 @@
+# tools/bench_large_pdf.py
+# 대용량 PDF 메모리 벤치마크: 페이지 수(10 → 500)별 최대 RSS 비교
+#   python -m tools.bench_large_pdf                       # 텍스트 PDF, streaming vs legacy
+#   python -m tools.bench_large_pdf --kind scan --pages 10 50 100   # 스캔본(OCR: poppler/tesseract 필요)
+# 각 측정은 별도 프로세스에서 실행해 ru_maxrss(최대 RSS)를 그대로 비교한다.
+# scan: 모든 페이지가 OCR 대상. streaming은 1장씩 렌더링(iter_pdf_pages), legacy는 convert_from_path 일괄 렌더링.
+#       OCR 실패는 파이프라인에서 경고 후 빈 페이지로 처리되므로, 도구가 없으면 측정 전에 중단한다.
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+_CHILD = r"""
+import json, resource, sys, time
+from app.document import Document
+from app.splitters import split_spans
+from app.rules import apply_rules_doc
+from app.utils_pdf import pdf_to_pages, iter_pdf_pages
+
+path, mode = sys.argv[1], sys.argv[2]
+t = time.perf_counter()
+if mode == "streaming":
+    doc = Document.from_pages(iter_pdf_pages(path))
+else:
+    doc = Document.from_pages(pdf_to_pages(path, max_pages=10**6, keep_empty=True))
+split_spans(doc)
+hits = apply_rules_doc(doc)
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+scale = 1 if sys.platform == "darwin" else 1024  # macOS: bytes / Linux: KB
+print(json.dumps({"peak_rss_mb": peak * scale / 2**20, "seconds": time.perf_counter() - t,
+                  "chars": len(doc.text), "clauses": len(doc), "hits": len(hits)}))
+"""
+
+
+def _pdf_escape(s: str) -> str:
+    return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_text_pdf(path: str, n_pages: int, lines_per_page: int = 40) -> None:
+    """외부 의존성 없이 Helvetica 텍스트 PDF 생성 (조항 헤더 + 위험 문구 포함)"""
+    objs = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    clause = 1
+    for p in range(n_pages):
+        ops = ["BT /F1 10 Tf 50 800 Td 12 TL"]
+        for j in range(lines_per_page):
+            if j % 8 == 0:
+                line = f"{clause}. Clause {clause} on page {p + 1}"
+                clause += 1
+            else:
+                line = f"The tenant shall bear all costs and the deposit is returned within {j} days."
+            ops.append(f"({_pdf_escape(line)}) '")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1")
+        objs.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objs)
+        objs.append(("<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                     f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>").encode())
+        kids.append(f"{len(objs)} 0 R")
+    objs[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {n_pages} >>".encode()
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for i, body in enumerate(objs, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n" % i + body + b"\nendobj\n")
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1))
+        for off in offsets:
+            f.write(b"%010d 00000 n \n" % off)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, xref))
+
+
+def make_scan_pdf(path: str, n_pages: int) -> None:
+    """이미지 전용(스캔본) PDF: 모든 페이지가 OCR 대상"""
+    from PIL import Image, ImageDraw
+    img = Image.new("L", (1240, 1754), 255)  # A4 @150dpi
+    draw = ImageDraw.Draw(img)
+    for j in range(40):
+        draw.text((80, 80 + j * 40), f"{j + 1}. The tenant shall bear all repair costs.", fill=0)
+    img.save(path, save_all=True, append_images=[img] * (n_pages - 1), resolution=150)
+
+
+def measure(path: str, mode: str) -> dict:
+    out = subprocess.run([sys.executable, "-c", _CHILD, path, mode], capture_output=True, text=True,
+                         cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr else "child failed")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, nargs="+", default=[10, 50, 100, 250, 500])
+    ap.add_argument("--kind", choices=["text", "scan"], default="text")
+    ap.add_argument("--modes", nargs="+", default=["streaming", "legacy"])
+    ap.add_argument("--json", help="결과를 JSON 파일로 저장")
+    args = ap.parse_args()
+    if args.kind == "scan":
+        missing = [b for b in ("pdftoppm", "tesseract") if shutil.which(b) is None]
+        if missing:
+            ap.error(f"--kind scan 측정에는 poppler-utils/tesseract-ocr가 필요합니다. (없음: {', '.join(missing)})")
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.pages:
+            path = os.path.join(tmp, f"bench_{args.kind}_{n}.pdf")
+            (make_text_pdf if args.kind == "text" else make_scan_pdf)(path, n)
+            for mode in args.modes:
+                r = {"pages": n, "mode": mode, **measure(path, mode)}
+                rows.append(r)
+                print(f"{n:5d} pages  {mode:9}  peak RSS {r['peak_rss_mb']:7.1f} MB  "
+                      f"{r['seconds']:6.2f}s  chars={r['chars']}  clauses={r['clauses']}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"kind": args.kind, "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
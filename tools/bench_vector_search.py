@@ -0,0 +1,103 @@
+# tools/bench_vector_search.py
+# ANN 백엔드 벤치마크: 정확 검색(flat/f32) 대비 recall@k, QPS(query_many), 벡터당 바이트
+#   python -m tools.bench_vector_search --n 200000 --dim 768 --queries 1000 --k 10
+#   python -m tools.bench_vector_search --from-index   # data/index 의 실제 조항 벡터 사용
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.vector_search import ANNIndex
+
+DEFAULT_CONFIGS = [
+    {"backend": "flat", "storage": "f16"},
+    {"backend": "ivf", "storage": "f32"},
+    {"backend": "ivf", "storage": "f16"},
+    {"backend": "ivf", "storage": "pq"},
+    {"backend": "ivf", "storage": "pq", "rerank": None},  # None → --rerank 값 (원본 벡터로 재정렬)
+    {"backend": "hnsw", "storage": "f32"},
+    {"backend": "hnsw", "storage": "f16"},
+]
+
+
+def _synthetic(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    """조항 임베딩과 비슷하게 군집 구조가 있는 합성 데이터"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(n // 500, 8), dim)).astype(np.float32)
+    X = centers[rng.integers(0, centers.shape[0], n)] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    return X
+
+
+def _recall(approx: np.ndarray, exact: np.ndarray) -> float:
+    k = exact.shape[1]
+    hit = sum(len(set(a.tolist()) & set(e.tolist())) for a, e in zip(approx, exact))
+    return hit / (exact.shape[0] * k)
+
+
+def run(X: np.ndarray, Q: np.ndarray, k: int, configs, nlist: int, nprobe: int, pq_m: int, rerank: int = 64):
+    Xn = X / np.maximum(np.linalg.norm(X, axis=1, keepdims=True), 1e-12)  # 재정렬용 원본 (ClauseIndex의 memmap 역할)
+    exact = ANNIndex(backend="flat", storage="f32").build(X)
+    t = time.perf_counter()
+    truth, _ = exact.query_many(Q, k)
+    base_qps = Q.shape[0] / (time.perf_counter() - t)
+    rows = [{"backend": "flat", "storage": "f32", "recall": 1.0, "qps": base_qps,
+             "bytes_per_vector": exact.bytes_per_vector, "build_s": 0.0}]
+
+    for cfg in configs:
+        if "rerank" in cfg:
+            cfg = dict(cfg, rerank=cfg["rerank"] or rerank)
+        try:
+            t = time.perf_counter()
+            idx = ANNIndex(nlist=nlist, nprobe=nprobe, pq_m=pq_m, **cfg).build(X)
+            build_s = time.perf_counter() - t
+        except ImportError as e:
+            print(f"skip {cfg}: {e}")
+            continue
+        t = time.perf_counter()
+        ids, _ = idx.query_many(Q, k, vectors=Xn)
+        qps = Q.shape[0] / (time.perf_counter() - t)
+        rows.append({**cfg, "recall": _recall(ids, truth), "qps": qps,
+                     "bytes_per_vector": idx.bytes_per_vector, "build_s": build_s})
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=100000)
+    ap.add_argument("--dim", type=int, default=768)
+    ap.add_argument("--queries", type=int, default=1000)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--nlist", type=int, default=256)
+    ap.add_argument("--nprobe", type=int, default=8)
+    ap.add_argument("--pq-m", type=int, default=16)
+    ap.add_argument("--rerank", type=int, default=64, help="재정렬 후보 배수 (k*rerank개를 원본 벡터로 재점수)")
+    ap.add_argument("--from-index", action="store_true", help="data/index 조항 벡터로 측정")
+    ap.add_argument("--json", help="결과를 JSON 파일로 저장")
+    args = ap.parse_args()
+
+    if args.from_index:
+        from app.clause_index import get_index
+        idx = get_index()
+        if not len(idx):
+            raise SystemExit("❌ 조항 인덱스가 비어 있습니다. (python -m tools.build_clause_index)")
+        X = np.asarray(idx._vecs, dtype=np.float32)
+    else:
+        X = _synthetic(args.n + args.queries, args.dim)
+    rng = np.random.default_rng(1)
+    qsel = rng.choice(X.shape[0], size=min(args.queries, X.shape[0]), replace=False)
+    Q = X[qsel] + 0.05 * rng.standard_normal((len(qsel), X.shape[1])).astype(np.float32)
+
+    rows = run(X, Q, args.k, DEFAULT_CONFIGS, args.nlist, args.nprobe, args.pq_m, args.rerank)
+    print(f"n={X.shape[0]} dim={X.shape[1]} queries={Q.shape[0]} k={args.k}")
+    print(f"{'backend':8} {'storage':7} {'rerank':>6} {'recall@k':>9} {'QPS':>10} {'B/vec':>8} {'build_s':>8}")
+    for r in rows:
+        print(f"{r['backend']:8} {r['storage']:7} {r.get('rerank', 0):6d} {r['recall']:9.3f} {r['qps']:10.0f} "
+              f"{r['bytes_per_vector']:8.1f} {r['build_s']:8.2f}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"n": int(X.shape[0]), "dim": int(X.shape[1]), "k": args.k, "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+# tools/build_clause_index.py
+# 저장된 전체 리포트(data/reports)를 조항 벡터 인덱스에 반영 (이미 인덱싱된 문서는 스킵)
+# CLAUSE_INDEX_ANN 설정 시 ANN 인덱스(data/index/ann.npz)도 구축/갱신해 첫 검색 요청이 학습을 기다리지 않게 함
+from app.clause_index import get_index, index_all_reports
+
+if __name__ == "__main__":
+    added = index_all_reports()
+    idx = get_index()
+    print(f"✅ clauses added: {added}, total: {len(idx)}")
+    if idx.sync_ann(save=True):
+        print(f"✅ ANN index saved: {idx.ann_path}")
@@ -0,0 +1,34 @@
+# tools/export_reports.py
+# 리포트/조항/리스크를 일자 파티션 Parquet로 증분 내보내기 (분석/BI용)
+#   python -m tools.export_reports                  # 지난 실행 이후 저장/재스캔된 문서만 반영 (doc_id 기준 교체)
+#   python -m tools.export_reports --full           # 전체 재생성
+# 읽기 예: pyarrow.dataset.dataset("data/export/risks", partitioning="hive").to_table(columns=["type", "severity"])
+import argparse
+import time
+
+from app.export import EXPORT_DIR, export_reports, load_watermark
+from app.storage import REPORT_DIR
+
+
+def main():
+    ap = argparse.ArgumentParser(description="리포트 → 일자 파티션 컬럼 파일 증분 내보내기")
+    ap.add_argument("--reports", default=REPORT_DIR, help="리포트 JSON 디렉터리")
+    ap.add_argument("--out", default=EXPORT_DIR, help="내보내기 디렉터리")
+    ap.add_argument("--format", choices=["parquet", "arrow"], default="parquet")
+    ap.add_argument("--full", action="store_true", help="기존 내보내기 삭제 후 전체 재생성")
+    ap.add_argument("--chunk", type=int, default=2000, help="row group 단위 문서 수")
+    args = ap.parse_args()
+
+    before = load_watermark(args.out)
+    t0 = time.time()
+    try:
+        res = export_reports(args.reports, args.out, fmt=args.format, full=args.full, chunk=args.chunk)
+    except ValueError as e:
+        ap.error(str(e))
+    rows = " / ".join(f"{t} {n}(-{res['replaced'][t]})" for t, n in res["rows"].items())
+    print(f"■ {res['docs']} docs exported, {res['skipped']} unreadable (retried next run) | rows written(replaced): {rows} | "
+          f"{res['rewritten_parts']} old parts rewritten | {time.time() - t0:.1f}s | watermark {before.get('cutoff', 0):.0f} → {res['cutoff']:.0f}")
+
+
+if __name__ == "__main__":
+    main()
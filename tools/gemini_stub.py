@@ -0,0 +1,177 @@
+# tools/gemini_stub.py
+# 부하 테스트용 로컬 Gemini REST 스텁 (generateContent / batchEmbedContents / embedContent)
+#   python -m tools.gemini_stub --port 8089 --latency-ms 400 --jitter-ms 150 --rate-429 0.05 --malformed-rate 0.02
+#   서버 쪽: GEMINI_API_ENDPOINT=http://127.0.0.1:8089 GOOGLE_API_KEY=stub uvicorn app.main:app
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+import numpy as np
+
+_ITEM = re.compile(r'^\d+\. """', re.M)  # llm_client_gemini 프롬프트의 조항 번호 줄
+_VERDICTS = ("risky", "watch", "ok")
+
+
+class GeminiStub:
+    """
+    Gemini REST API 흉내 서버. 요청마다 latency±jitter 만큼 지연 후
+    rate_429 확률로 429(RESOURCE_EXHAUSTED), malformed_rate 확률로 JSON이 깨진 응답을 돌려준다.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 300.0,
+                 jitter_ms: float = 100.0, rate_429: float = 0.0, malformed_rate: float = 0.0,
+                 embed_dim: int = 768, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_429 = rate_429
+        self.malformed_rate = malformed_rate
+        self.embed_dim = embed_dim
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {"generate": 0, "embed": 0, "429": 0, "malformed": 0, "other": 0}
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "GeminiStub":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="gemini-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counters)
+
+    # ---------- 응답 생성 ----------
+    def _roll(self, key: str, p: float) -> bool:
+        with self._lock:
+            hit = p > 0 and self._rng.random() < p
+            if hit:
+                self.counters[key] += 1
+            return hit
+
+    def _delay(self) -> None:
+        with self._lock:
+            ms = max(0.0, self._rng.gauss(self.latency_ms, self.jitter_ms)) if self.jitter_ms else self.latency_ms
+        time.sleep(ms / 1000)
+
+    def _vector(self, text: str) -> list:
+        # 같은 텍스트 → 같은 벡터 (임베딩 캐시/인덱스 동작 확인 가능)
+        seed = int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "little")
+        v = np.random.default_rng(seed).standard_normal(self.embed_dim).astype(np.float32)
+        return (v / np.linalg.norm(v)).round(6).tolist()
+
+    def _generate(self, body: Dict) -> Dict:
+        prompt = "".join(p.get("text", "") for c in body.get("contents") or [] for p in c.get("parts") or [])
+        n = max(1, len(_ITEM.findall(prompt)))
+        if self._roll("malformed", self.malformed_rate):
+            text = '[{"verdict": "risky", "reason": "응답이 중간에 끊김'
+        else:
+            with self._lock:
+                items = [{"verdict": self._rng.choice(_VERDICTS), "reason": "stub 판정"} for _ in range(n)]
+            text = "```json\n" + json.dumps(items, ensure_ascii=False) + "\n```"
+        return {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"},
+                                "finishReason": "STOP", "index": 0}]}
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send(self, code: int, obj: Dict) -> None:
+                data = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json; charset=UTF-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path.startswith("/stats"):
+                    self._send(200, stub.stats())
+                else:
+                    self._send(404, {"error": {"code": 404, "message": "not found", "status": "NOT_FOUND"}})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    body = {}
+                path = self.path.split("?", 1)[0]
+                kind = ("generate" if path.endswith(":generateContent")
+                        else "embed" if path.endswith(("EmbedContents", ":embedContent")) else "other")
+                with stub._lock:
+                    stub.counters[kind] += 1
+                if kind == "other":
+                    self._send(404, {"error": {"code": 404, "message": path, "status": "NOT_FOUND"}})
+                    return
+                stub._delay()
+                if stub._roll("429", stub.rate_429):
+                    self._send(429, {"error": {"code": 429, "message": "Resource has been exhausted (stub).",
+                                               "status": "RESOURCE_EXHAUSTED"}})
+                elif kind == "generate":
+                    self._send(200, stub._generate(body))
+                elif path.endswith(":embedContent"):
+                    text = "".join(p.get("text", "") for p in (body.get("content") or {}).get("parts") or [])
+                    self._send(200, {"embedding": {"values": stub._vector(text)}})
+                else:
+                    reqs = body.get("requests") or []
+                    self._send(200, {"embeddings": [
+                        {"values": stub._vector("".join(p.get("text", "") for p in r["content"]["parts"]))}
+                        for r in reqs]})
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def add_stub_args(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--latency-ms", type=float, default=300.0, help="스텁 평균 응답 지연")
+    ap.add_argument("--jitter-ms", type=float, default=100.0, help="지연 표준편차")
+    ap.add_argument("--rate-429", type=float, default=0.0, help="429 응답 비율 (0~1)")
+    ap.add_argument("--malformed-rate", type=float, default=0.0, help="깨진 JSON 응답 비율 (0~1)")
+    ap.add_argument("--embed-dim", type=int, default=768)
+    ap.add_argument("--seed", type=int, default=None)
+
+
+def stub_from_args(args, host: str = "127.0.0.1", port: int = 0) -> GeminiStub:
+    return GeminiStub(host, port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, rate_429=args.rate_429,
+                      malformed_rate=args.malformed_rate, embed_dim=args.embed_dim, seed=args.seed)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="로컬 Gemini REST 스텁")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8089)
+    add_stub_args(ap)
+    args = ap.parse_args()
+    stub = stub_from_args(args, args.host, args.port)
+    print(f"▶ Gemini stub on {stub.url}  (GEMINI_API_ENDPOINT={stub.url})", flush=True)
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"■ {stub.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+# tools/ingest.py
+# 디렉터리 일괄 적재: PDF 트리를 프로세스 풀로 분석 → 리포트/DB 일괄 저장, 체크포인트로 이어서 실행
+#   python -m tools.ingest /archive/contracts --workers 8 --llm-rpm 600
+#   (중단 후 같은 명령을 다시 실행하면 체크포인트 이후부터 재개)
+import argparse
+import json
+import os
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from app.ratelimit import SharedRateLimiter
+
+DEFAULT_CHECKPOINT = ".ingest_checkpoint.jsonl"
+
+
+def doc_id_for(path: str) -> str:
+    """같은 파일은 재실행해도 같은 doc_id (중복 적재 방지)"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, os.path.abspath(path)))
+
+
+def iter_pdfs(root: str):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(".pdf"):
+                yield os.path.join(dirpath, name)
+
+
+def load_checkpoint(path: str, retry_errors: bool) -> set:
+    """이미 처리된 원본 경로 집합 (retry_errors면 실패 건은 다시 처리)"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue  # 중단 시 잘린 마지막 줄
+            if rec.get("status") == "ok" or not retry_errors:
+                done.add(rec["path"])
+    return done
+
+
+# ---------- 워커 프로세스 ----------
+def _init_worker(limiter) -> None:
+    # 모든 워커가 하나의 Gemini 리미터를 공유
+    from app import llm_client_gemini
+    llm_client_gemini.set_rate_limiter(limiter)
+
+
+def _analyze(path: str, doc_id: str) -> dict:
+    from app.pipeline import build_report
+    try:
+        report = build_report(doc_id, path)
+        return {"path": path, "report": report.model_dump(mode="json")}
+    except Exception as e:
+        detail = getattr(e, "detail", None) or f"{type(e).__name__}: {e}"
+        return {"path": path, "doc_id": doc_id, "error": str(detail)}
+
+
+# ---------- 부모 프로세스 ----------
+class _Writer:
+    """
+    결과를 모아 batch 단위로 리포트 파일/DB/인덱스에 저장한 뒤 체크포인트 기록.
+    저장 실패(DB 일시 장애 등) 시 retries회까지 대기 후 재시도하며, 단계별 완료를 기록해 끝난 단계는 반복하지 않는다.
+    재시도까지 실패하면 예외를 올려 실행을 중단 (체크포인트에 없으므로 다음 실행에서 재처리,
+    DB 저장은 id 기준 멱등이라 중복 없음)
+    """
+
+    def __init__(self, checkpoint: str, batch_size: int, index: bool, retries: int = 3, backoff: float = 2.0):
+        from app.pipeline import save_reports_to_db, index_report
+        from app.schemas import Report
+        from app.storage import save_report
+        self._save_db = save_reports_to_db
+        self._index = index_report if index else None
+        self._save_file = save_report
+        self._Report = Report
+        self.checkpoint = checkpoint
+        self.batch_size = batch_size
+        self.retries = retries
+        self.backoff = backoff
+        self.buffer = []
+        self.errors = []
+        self._done = set()  # 현재 buffer에 대해 끝난 단계: "file", "db", "index"
+
+    def add(self, res: dict) -> None:
+        if "error" in res:
+            self.errors.append({"path": res["path"], "doc_id": res["doc_id"], "status": "error", "error": res["error"]})
+        else:
+            self.buffer.append(res)
+        if len(self.buffer) + len(self.errors) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        reports = [self._Report(**r["report"]) for r in self.buffer]
+        for attempt in range(self.retries + 1):
+            try:
+                self._store(reports)
+                break
+            except Exception as e:
+                if attempt >= self.retries:
+                    raise
+                wait_s = self.backoff * (2 ** attempt)
+                print(f"⚠ batch 저장 실패 ({type(e).__name__}: {e}) → {wait_s:.0f}s 후 재시도 "
+                      f"({attempt + 1}/{self.retries}, 완료 단계: {sorted(self._done) or '-'})", flush=True)
+                time.sleep(wait_s)
+        recs = [{"path": res["path"], "doc_id": r.doc_id, "status": "ok", "pages": r.meta.pages}
+                for res, r in zip(self.buffer, reports)] + self.errors
+        # 저장이 끝난 건만 체크포인트에 기록 → 중단돼도 미저장 문서는 재처리
+        with open(self.checkpoint, "a", encoding="utf-8") as f:
+            for rec in recs:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        self.buffer, self.errors, self._done = [], [], set()
+
+    def _store(self, reports) -> None:
+        if "file" not in self._done:
+            for r in reports:
+                self._save_file(str(r.doc_id), r.model_dump())
+            self._done.add("file")
+        if "db" not in self._done:
+            self._save_db(reports)
+            self._done.add("db")
+        if self._index and "index" not in self._done:
+            for r in reports:
+                self._index(r)
+            self._done.add("index")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="PDF 디렉터리 일괄 분석/적재")
+    ap.add_argument("root", help="PDF가 들어 있는 최상위 디렉터리")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    ap.add_argument("--llm-rpm", type=float, default=float(os.getenv("LLM_RPM", "0")),
+                    help="전체 워커 합산 Gemini 분당 요청 수 (0이면 제한 없음)")
+    ap.add_argument("--batch-size", type=int, default=50, help="리포트/DB 일괄 저장 단위")
+    ap.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    ap.add_argument("--retry-errors", action="store_true", help="체크포인트의 실패 건도 다시 처리")
+    ap.add_argument("--flush-retries", type=int, default=3, help="batch 저장 실패 시 재시도 횟수")
+    ap.add_argument("--no-index", action="store_true", help="조항 벡터 인덱스 갱신 생략")
+    ap.add_argument("--progress-every", type=float, default=10.0, help="진행 출력 간격(초)")
+    args = ap.parse_args()
+
+    done = load_checkpoint(args.checkpoint, args.retry_errors)
+    todo = (p for p in iter_pdfs(args.root) if p not in done)
+    print(f"▶ skip {len(done)} already ingested (checkpoint: {args.checkpoint})")
+
+    limiter = SharedRateLimiter.per_minute(args.llm_rpm, burst=max(1, args.workers))
+    writer = _Writer(args.checkpoint, args.batch_size, index=not args.no_index, retries=args.flush_retries)
+    n_ok = n_err = n_pages = 0
+    t0 = last = time.time()
+
+    def progress(final: bool = False):
+        mins = max(time.time() - t0, 1e-9) / 60
+        print(f"{'■' if final else '·'} docs {n_ok} ok / {n_err} err | "
+              f"{n_ok / mins:.1f} docs/min | {n_pages / mins:.1f} pages/min", flush=True)
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(limiter,)) as pool:
+        inflight = set()
+        exhausted = False
+        try:
+            while inflight or not exhausted:
+                # 메모리 보호: 동시에 제출하는 작업 수를 워커 수의 4배로 제한
+                while not exhausted and len(inflight) < args.workers * 4:
+                    path = next(todo, None)
+                    if path is None:
+                        exhausted = True
+                        break
+                    inflight.add(pool.submit(_analyze, path, doc_id_for(path)))
+                if not inflight:
+                    break
+                finished, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    res = fut.result()
+                    if "error" in res:
+                        n_err += 1
+                    else:
+                        n_ok += 1
+                        n_pages += res["report"]["meta"]["pages"]
+                    writer.add(res)
+                if time.time() - last >= args.progress_every:
+                    progress()
+                    last = time.time()
+        except BaseException:
+            # 예외 시 남은 buffer는 저장하지 않음 (체크포인트에 없으므로 다음 실행에서 재처리)
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        writer.flush()
+    progress(final=True)
+
+
+if __name__ == "__main__":
+    main()
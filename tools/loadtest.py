@@ -0,0 +1,282 @@
+# tools/loadtest.py
+# E2E 부하 테스트: 로컬 Gemini 스텁 + uvicorn으로 앱을 띄우고 /upload → /report 를 목표 속도로 재생
+#   python -m tools.loadtest --text "data/uploads/*.pdf" --scanned "samples/scans/*.pdf" --scanned-ratio 0.2 \
+#       --rps 2 --duration 120 --latency-ms 400 --rate-429 0.05 --malformed-rate 0.02 --out loadtest.json
+#   python -m tools.loadtest ... --compare loadtest_prev.json      # 이전 결과와 p50/p99/처리량 비교
+# 결과 JSON에는 설정/커밋/지연 백분위/처리량/오류율/단계별(meta.timings) 시간이 담긴다.
+import argparse
+import glob
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from tools.gemini_stub import add_stub_args, stub_from_args
+
+PCTS = (50, 90, 95, 99)
+
+
+def _files(patterns: List[str]) -> List[str]:
+    return sorted({p for pat in patterns or [] for p in glob.glob(pat) if p.lower().endswith(".pdf")})
+
+
+def _summary(values: List[float]) -> Dict:
+    if not values:
+        return {"n": 0}
+    a = np.asarray(values, dtype=np.float64)
+    out = {"n": int(a.size), "mean": round(float(a.mean()), 4), "max": round(float(a.max()), 4)}
+    for p in PCTS:
+        out[f"p{p}"] = round(float(np.percentile(a, p)), 4)
+    return out
+
+
+def _git_rev() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+# ---------- 앱 서버 ----------
+def start_app(port: int, workers: int, env: Dict[str, str], log_path: str) -> subprocess.Popen:
+    cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+           "--workers", str(workers), "--log-level", "warning"]
+    log = open(log_path, "w", encoding="utf-8")
+    return subprocess.Popen(cmd, env={**os.environ, **env}, stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_ready(url: str, proc: Optional[subprocess.Popen], timeout: float = 60.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"앱 서버가 종료되었습니다 (exit {proc.returncode})")
+        try:
+            if httpx.get(f"{url}/health", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.3)
+    raise RuntimeError(f"앱 서버 준비 시간 초과: {url}")
+
+
+# ---------- 부하 발생 ----------
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples: List[Dict] = []
+
+    def add(self, **rec) -> None:
+        with self._lock:
+            self.samples.append(rec)
+
+
+def one_request(client: httpx.Client, url: str, path: str, kind: str, report_reads: int, rec: Recorder) -> None:
+    t0 = time.perf_counter()
+    try:
+        with open(path, "rb") as f:
+            r = client.post(f"{url}/upload", files={"file": (os.path.basename(path), f, "application/pdf")})
+        status = r.status_code
+    except httpx.TimeoutException:
+        status = "timeout"
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    latency = time.perf_counter() - t0
+    sample = {"endpoint": "upload", "kind": kind, "status": status, "latency": latency}
+    if status == 200:
+        body = r.json()
+        meta = body.get("meta") or {}
+        sample.update(pages=meta.get("pages", 0), timings=meta.get("timings") or {})
+        rec.add(**sample)
+        for _ in range(report_reads):
+            t1 = time.perf_counter()
+            try:
+                status = client.get(f"{url}/report/{body['doc_id']}").status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            rec.add(endpoint="report", kind=kind, status=status, latency=time.perf_counter() - t1)
+    else:
+        rec.add(**sample)
+
+
+def run_load(url: str, text: List[str], scanned: List[str], scanned_ratio: float, rps: float, duration: float,
+             max_inflight: int, report_reads: int, poisson: bool, timeout: float, seed: Optional[int]) -> Dict:
+    """개방형 부하: 도착 시각은 응답과 무관하게 rps로 정해짐. 동시 요청이 max_inflight면 클라이언트 측 드롭."""
+    rng = random.Random(seed)
+    rec = Recorder()
+    inflight = threading.Semaphore(max_inflight)
+    dropped = 0
+    sent = 0
+    limits = httpx.Limits(max_connections=max_inflight, max_keepalive_connections=max_inflight)
+    with httpx.Client(timeout=timeout, limits=limits) as client, ThreadPoolExecutor(max_inflight) as pool:
+        t0 = time.perf_counter()
+        next_at = 0.0
+        while next_at < duration:
+            delay = t0 + next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            use_scanned = scanned and (not text or rng.random() < scanned_ratio)
+            kind = "scanned" if use_scanned else "text"
+            path = rng.choice(scanned if use_scanned else text)
+            if inflight.acquire(blocking=False):
+                sent += 1
+
+                def task(p=path, k=kind):
+                    try:
+                        one_request(client, url, p, k, report_reads, rec)
+                    finally:
+                        inflight.release()
+
+                pool.submit(task)
+            else:
+                dropped += 1
+            next_at += rng.expovariate(rps) if poisson else 1.0 / rps
+        send_done = time.perf_counter() - t0
+    elapsed = time.perf_counter() - t0
+    return {"samples": rec.samples, "sent": sent, "client_dropped": dropped,
+            "send_seconds": round(send_done, 3), "elapsed": round(elapsed, 3)}
+
+
+# ---------- 집계 ----------
+def summarize(run: Dict) -> Dict:
+    samples, elapsed = run["samples"], max(run["elapsed"], 1e-9)
+    out: Dict = {"elapsed_s": run["elapsed"], "sent": run["sent"], "client_dropped": run["client_dropped"],
+                 "endpoints": {}, "stages": {}}
+    for ep in ("upload", "report"):
+        rows = [s for s in samples if s["endpoint"] == ep]
+        ok = [s for s in rows if s["status"] == 200]
+        errors: Dict[str, int] = {}
+        for s in rows:
+            if s["status"] != 200:
+                errors[str(s["status"])] = errors.get(str(s["status"]), 0) + 1
+        out["endpoints"][ep] = {
+            "requests": len(rows), "ok": len(ok),
+            "error_rate": round(1 - len(ok) / len(rows), 4) if rows else 0.0,
+            "errors": errors,
+            "throughput_rps": round(len(ok) / elapsed, 3),
+            "latency_ok_s": _summary([s["latency"] for s in ok]),
+            "latency_by_kind_s": {k: _summary([s["latency"] for s in ok if s["kind"] == k])
+                                  for k in sorted({s["kind"] for s in ok})},
+        }
+    uploads = [s for s in samples if s["endpoint"] == "upload" and s["status"] == 200]
+    out["pages_per_min"] = round(sum(s.get("pages", 0) for s in uploads) / elapsed * 60, 2)
+    # 단계별: meta.timings + 나머지(업로드 전송/대기열/응답 직렬화 등 = 전체 지연 - 단계 합)
+    for kind in sorted({s["kind"] for s in uploads}):
+        rows = [s for s in uploads if s["kind"] == kind]
+        stages = sorted({k for s in rows for k in s["timings"]})
+        per = {st: _summary([s["timings"][st] for s in rows if st in s["timings"]]) for st in stages}
+        per["queue_io"] = _summary([max(0.0, s["latency"] - sum(s["timings"].values())) for s in rows])
+        out["stages"][kind] = per
+    return out
+
+
+def print_summary(res: Dict) -> None:
+    r = res["results"]
+    print(f"■ {r['elapsed_s']:.1f}s | sent {r['sent']} | client dropped {r['client_dropped']} | "
+          f"{r['pages_per_min']} pages/min | stub {res.get('stub_stats')}")
+    for ep, e in r["endpoints"].items():
+        lat = e["latency_ok_s"]
+        pcts = " ".join(f"p{p}={lat.get(f'p{p}', 0):.3f}" for p in PCTS) if lat["n"] else "-"
+        print(f"  {ep:7s} {e['ok']}/{e['requests']} ok  err {e['error_rate']:.1%} {e['errors'] or ''}  "
+              f"{e['throughput_rps']} rps  {pcts}")
+    for kind, per in r["stages"].items():
+        cells = "  ".join(f"{st}={v['p50']:.3f}/{v['p99']:.3f}" for st, v in per.items() if v["n"])
+        print(f"  stages[{kind}] p50/p99 s: {cells}")
+
+
+def compare(cur: Dict, prev_path: str) -> None:
+    with open(prev_path, "r", encoding="utf-8") as f:
+        prev = json.load(f)
+    print(f"▶ compare with {prev_path} (rev {prev.get('git_rev')} → {cur.get('git_rev')})")
+    for ep in ("upload", "report"):
+        a = prev["results"]["endpoints"].get(ep) or {}
+        b = cur["results"]["endpoints"].get(ep) or {}
+        for key in ("p50", "p99"):
+            x, y = (a.get("latency_ok_s") or {}).get(key), (b.get("latency_ok_s") or {}).get(key)
+            if x and y:
+                print(f"  {ep:7s} {key}: {x:.3f}s → {y:.3f}s ({(y - x) / x:+.1%})")
+        x, y = a.get("throughput_rps"), b.get("throughput_rps")
+        if x and y:
+            print(f"  {ep:7s} throughput: {x} → {y} rps ({(y - x) / x:+.1%})")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="/upload·/report E2E 부하 테스트 (로컬 Gemini 스텁)")
+    ap.add_argument("--text", action="append", default=[], help="텍스트 PDF glob (반복 가능)")
+    ap.add_argument("--scanned", action="append", default=[], help="스캔본 PDF glob (반복 가능)")
+    ap.add_argument("--scanned-ratio", type=float, default=0.2, help="요청 중 스캔본 비율")
+    ap.add_argument("--rps", type=float, default=1.0, help="목표 업로드 도착률 (req/s)")
+    ap.add_argument("--duration", type=float, default=60.0, help="요청 발생 시간(초)")
+    ap.add_argument("--poisson", action="store_true", help="도착 간격을 지수분포로 (기본: 고정 간격)")
+    ap.add_argument("--max-inflight", type=int, default=64, help="클라이언트 동시 요청 상한")
+    ap.add_argument("--report-reads", type=int, default=1, help="업로드 성공 후 GET /report 횟수")
+    ap.add_argument("--timeout", type=float, default=300.0, help="요청 타임아웃(초)")
+    ap.add_argument("--url", default=None, help="이미 떠 있는 앱 주소 (지정 시 앱/스텁을 띄우지 않음)")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--workers", type=int, default=1, help="uvicorn 워커 수")
+    ap.add_argument("--storage-dir", default=None, help="앱 STORAGE_DIR (기본: 임시 디렉터리)")
+    ap.add_argument("--keep-db", action="store_true", help="DATABASE_URL 유지 (기본: DB 저장 끔)")
+    ap.add_argument("--env", action="append", default=[], help="앱에 넘길 추가 환경변수 KEY=VALUE")
+    ap.add_argument("--out", default="loadtest.json")
+    ap.add_argument("--compare", default=None, help="이전 결과 JSON")
+    add_stub_args(ap)
+    args = ap.parse_args()
+
+    text, scanned = _files(args.text), _files(args.scanned)
+    if not text and not scanned:
+        ap.error("--text 또는 --scanned 로 PDF를 지정하세요.")
+
+    stub = proc = None
+    url = args.url
+    if url is None:
+        stub = stub_from_args(args).start()
+        storage = args.storage_dir or tempfile.mkdtemp(prefix="loadtest_")
+        env = {"GOOGLE_API_KEY": "stub", "GEMINI_API_ENDPOINT": stub.url, "LLM_PROVIDER": "gemini",
+               "STORAGE_DIR": storage}
+        if not args.keep_db:
+            env["DATABASE_URL"] = ""
+        env.update(kv.split("=", 1) for kv in args.env)
+        url = f"http://127.0.0.1:{args.port}"
+        proc = start_app(args.port, args.workers, env, os.path.join(storage, "uvicorn.log"))
+        print(f"▶ stub {stub.url} | app {url} | storage {storage}", flush=True)
+    try:
+        wait_ready(url, proc)
+        print(f"▶ {len(text)} text + {len(scanned)} scanned PDFs | {args.rps} req/s × {args.duration}s", flush=True)
+        run = run_load(url, text, scanned, args.scanned_ratio, args.rps, args.duration, args.max_inflight,
+                       args.report_reads, args.poisson, args.timeout, args.seed)
+        health = httpx.get(f"{url}/health", timeout=5).json()
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+        if stub is not None:
+            stub.stop()
+
+    result = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_rev": _git_rev(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("compare", "out")},
+        "inputs": {"text": len(text), "scanned": len(scanned)},
+        "stub_stats": stub.stats() if stub else None,
+        "server_health": health,
+        "results": summarize(run),
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print_summary(result)
+    print(f"▶ saved {args.out}")
+    if args.compare:
+        compare(result, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# tools/profile_rules.py
+# RISK_RULES 패턴별 매칭 비용 측정: 저장 리포트의 조항 코퍼스로 느린 패턴/백트래킹 후보를 찾는다
+#   python -m tools.profile_rules --top 15
+#   python -m tools.profile_rules --unsplit --repeat 20 --engine regex --timeout-ms 50
+#   (--unsplit: 분할 실패로 문서 전체가 한 조항이 된 경우를 흉내)
+import argparse
+import glob
+import json
+import os
+
+from app.rules import profile_rules
+from app.storage import REPORT_DIR
+
+
+def load_corpus(report_dir: str, unsplit: bool, repeat: int) -> list:
+    texts = []
+    for path in sorted(glob.glob(os.path.join(report_dir, "*.json"))):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                clauses = json.load(f).get("clauses") or []
+        except (OSError, ValueError):
+            continue
+        items = [c.get("text") or "" for c in sorted(clauses, key=lambda c: c.get("id", 0))]
+        if unsplit:
+            texts.append(" ".join(items * max(1, repeat)))
+        else:
+            texts.extend(items)
+    return texts
+
+
+def main():
+    ap = argparse.ArgumentParser(description="RISK_RULES 패턴별 매칭 시간 프로파일")
+    ap.add_argument("--reports", default=REPORT_DIR, help="리포트 JSON 디렉터리")
+    ap.add_argument("--engine", choices=["re", "regex"], default=None, help="기본값: RULES_ENGINE")
+    ap.add_argument("--timeout-ms", type=float, default=None, help="regex 엔진 매치별 타임아웃")
+    ap.add_argument("--unsplit", action="store_true", help="리포트별 조항을 이어 붙여 한 덩어리로 매칭")
+    ap.add_argument("--repeat", type=int, default=1, help="--unsplit 시 본문 반복 횟수 (긴 입력 시뮬레이션)")
+    ap.add_argument("--top", type=int, default=10)
+    args = ap.parse_args()
+
+    texts = load_corpus(args.reports, args.unsplit, args.repeat)
+    if not texts:
+        print(f"리포트가 없습니다: {args.reports}")
+        return
+    chars = sum(len(t) for t in texts)
+    print(f"▶ {len(texts)} texts, {chars:,} chars (max {max(len(t) for t in texts):,})")
+
+    rows = profile_rules(texts, engine=args.engine, timeout_ms=args.timeout_ms)
+    total = sum(r["total_ms"] for r in rows) or 1e-9
+    print(f"{'total ms':>9} {'share':>6} {'max ms':>8} {'hits':>5} {'t/o':>4}  type / pattern")
+    for r in rows[:args.top]:
+        print(f"{r['total_ms']:9.1f} {r['total_ms'] / total:6.1%} {r['max_ms']:8.2f} {r['hits']:5d} "
+              f"{r['timeouts']:4d}  {r['type']} / {r['pattern']}" + ("  [invalid]" if r.get("error") else ""))
+    print(f"■ all patterns: {total:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
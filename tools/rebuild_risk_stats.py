@@ -0,0 +1,18 @@
+# tools/rebuild_risk_stats.py
+# 리스크 집계 카운터(GET /stats/risks)를 저장된 리포트 전체로 다시 계산
+#   python -m tools.rebuild_risk_stats      # 최초 도입 시 1회, 또는 카운터 불일치 복구 시 (적재 작업이 없을 때)
+import time
+
+from app import risk_stats
+from app.storage import REPORT_DIR
+
+
+def main():
+    t0 = time.time()
+    data = risk_stats.rebuild(REPORT_DIR)
+    print(f"■ {data['docs']} docs / {data['risks']} risks / {len(data['cube'])} cells / "
+          f"{len(data['patterns'])} patterns → {risk_stats.STATS_PATH} ({time.time() - t0:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# tools/rescan.py
+# RISK_RULES 변경 후 저장 리포트 재스캔 (OCR/LLM 재실행 없이 룰만 다시 적용)
+#   python -m tools.rescan --workers 8
+#   python -m tools.rescan --dry-run        # 바뀔 문서 수만 확인
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from app.ratelimit import SharedRateLimiter
+from app.rescan import rescan_file
+from app.rules import rules_fingerprint
+from app.storage import REPORT_DIR
+
+
+def _init_worker(limiter, no_llm: bool) -> None:
+    if no_llm:
+        os.environ["LLM_PROVIDER"] = "none"
+    from app import llm_client_gemini
+    llm_client_gemini.set_rate_limiter(limiter)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="룰 변경 시 저장 리포트 증분 재스캔")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    ap.add_argument("--force", action="store_true", help="rules_version이 같아도 재스캔")
+    ap.add_argument("--dry-run", action="store_true", help="파일/DB를 쓰지 않고 결과만 집계")
+    ap.add_argument("--no-llm", action="store_true", help="새 후보 조항도 LLM 호출 없이 pending 처리")
+    ap.add_argument("--llm-rpm", type=float, default=float(os.getenv("LLM_RPM", "0")))
+    args = ap.parse_args()
+
+    fp = rules_fingerprint()
+    paths = sorted(os.path.join(REPORT_DIR, n) for n in os.listdir(REPORT_DIR) if n.endswith(".json"))
+    print(f"▶ rules {fp} | {len(paths)} reports")
+
+    counts = {"current": 0, "unchanged": 0, "changed": 0, "error": 0}
+    db_updates = {}
+    t0 = time.time()
+    limiter = SharedRateLimiter.per_minute(args.llm_rpm, burst=max(1, args.workers))
+    work = partial(rescan_file, fingerprint=fp, force=args.force, write=not args.dry_run)
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                             initargs=(limiter, args.no_llm)) as pool:
+        for res in pool.map(work, paths, chunksize=16):
+            counts[res["status"]] += 1
+            if res["status"] == "changed":
+                db_updates[res["doc_id"]] = res["risks"]
+                print(f"  changed {res['doc_id']}")
+            elif res["status"] == "error":
+                print(f"  error   {res['doc_id']}: {res['error']}")
+
+    if db_updates and not args.dry_run:
+        from app.pipeline import replace_risks_in_db
+        from app.schemas import RiskItem
+        replace_risks_in_db({d: [RiskItem(**r) for r in risks] for d, risks in db_updates.items()})
+
+    print(f"■ {counts['changed']} changed / {counts['unchanged']} unchanged / "
+          f"{counts['current']} current / {counts['error']} error  ({time.time() - t0:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()